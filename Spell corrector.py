@@ -36,6 +36,8 @@ from keras.callbacks import ModelCheckpoint, TensorBoard
 import numpy as np
 import os
 from sklearn.model_selection import train_test_split
+from wer import calculate_WER_sent, calculate_WER
+from utils import save_vocab, load_vocab
 
 
 # # Utility functions
@@ -53,56 +55,6 @@ gpu_alloc()
 
 
 
-def calculate_WER_sent(gt, pred):
-    '''
-    calculate_WER('calculating wer between two sentences', 'calculate wer between two sentences')
-    '''
-    gt_words = gt.lower().split(' ')
-    pred_words = pred.lower().split(' ')
-    d = np.zeros(((len(gt_words) + 1), (len(pred_words) + 1)), dtype=np.uint8)
-    # d = d.reshape((len(gt_words)+1, len(pred_words)+1))
-
-    # Initializing error matrix
-    for i in range(len(gt_words) + 1):
-        for j in range(len(pred_words) + 1):
-            if i == 0:
-                d[0][j] = j
-            elif j == 0:
-                d[i][0] = i
-
-    # computation
-    for i in range(1, len(gt_words) + 1):
-        for j in range(1, len(pred_words) + 1):
-            if gt_words[i - 1] == pred_words[j - 1]:
-                d[i][j] = d[i - 1][j - 1]
-            else:
-                substitution = d[i - 1][j - 1] + 1
-                insertion = d[i][j - 1] + 1
-                deletion = d[i - 1][j] + 1
-                d[i][j] = min(substitution, insertion, deletion)
-    return d[len(gt_words)][len(pred_words)]
-
-
-
-def calculate_WER(gt, pred):
-    '''
-
-    :param gt: list of sentences of the ground truth
-    :param pred: list of sentences of the predictions
-    both lists must have the same length
-    :return: accumulated WER
-    '''
-#    assert len(gt) == len(pred)
-    WER = 0
-    nb_w = 0
-    for i in range(len(gt)):
-        #print(gt[i])
-        #print(pred[i])
-        WER += calculate_WER_sent(gt[i], pred[i])
-        nb_w += len(gt[i])
-
-    return WER / nb_w
-
 def noise_maker(sentence, threshold):
     '''Relocate, remove, or add characters to create spelling mistakes'''
     letters = ['a','b','c','d','e','f','g','h','i','j','k','l','m',
@@ -180,30 +132,6 @@ def load_data_with_noise(file_name, num_samples, noise_threshold, max_sent_len,
     return input_texts, target_texts, gt_texts
 
 
-def build_vocab(all_texts):
-    '''Build vocab dictionary to victorize chars into ints'''
-    vocab_to_int = {}
-    count = 0
-    
-    for sentence in all_texts:
-        for char in sentence:
-            if char not in vocab_to_int:
-                vocab_to_int[char] = count
-                count += 1
-    # Add special tokens to vocab_to_int
-    codes = ['\t','\n']
-    for code in codes:
-        if code not in vocab_to_int:
-            vocab_to_int[code] = count
-            count += 1
-    '''''Build inverse translation from int to char'''
-    int_to_vocab = {}
-    for character, value in vocab_to_int.items():
-        int_to_vocab[value] = character
-        
-    return vocab_to_int, int_to_vocab
-
-
 def vectorize_data(input_texts, target_texts, max_encoder_seq_length, num_encoder_tokens, vocab_to_int):
     '''Prepares the input text and targets into the proper seq2seq numpy arrays'''
     encoder_input_data = np.zeros(
@@ -314,10 +242,9 @@ def decode_texts(input_texts, model, latent_dim, vocab_to_int, max_encoder_seq_l
     #WER_spell_correction = calculate_WER(target_texts_, decoded_sentences)
     #print('WER_spell_correction: ', WER_spell_correction) 
     
-def train_test_spell_corr_model(input_texts, target_texts)
+def train_test_spell_corr_model(input_texts, target_texts, vocab_file)
 
-    all_texts = target_texts + input_texts
-    vocab_to_int, int_to_vocab = build_vocab(all_texts)
+    vocab_to_int, int_to_vocab = load_vocab(vocab_file)
 
     input_characters = sorted(list(vocab_to_int))
     target_characters = sorted(list(vocab_to_int))
@@ -491,11 +418,14 @@ min_sent_len = 4
 num_samples = 10000
 tess_correction_data = os.path.join(data_path, 'new_trained_data.txt')
 input_texts_OCR, target_texts_OCR, gt_OCR = load_data_with_gt(tess_correction_data, num_samples, max_sent_len, min_sent_len)
+# Vocab of the training data, loaded again by the inference, see utils.save_vocab
+vocab_file = os.path.join(data_path, 'vocab.json')
+save_vocab([tess_correction_data], vocab_file)
 
 input_texs = input_texs_OCR
 target_texts = target_texts_OCR
 
-train_test_spell_corr_model(input_texs, target_texts)
+train_test_spell_corr_model(input_texs, target_texts, vocab_file)
 
 '''
 # # Results of pre-training on generic data
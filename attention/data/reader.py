@@ -32,17 +32,16 @@ class Vocabulary(object):
         else:              
             self.vocabulary, self.reverse_vocabulary = self.build_vocab(text_file)
             
-    def build_vocab(self, text_file):
-        '''Build vocab dictionary to victorize chars into ints'''
+    def build_vocab(self, text_file, chunk_size=1 << 20):
+        '''Build vocab dictionary to victorize chars into ints, reading the file chunk_size chars at a time'''
         vocab_to_int = {}
         count = 0
-        #chars = open(text_file, encoding='utf8').read()
-        chars = open(text_file).read()
-    
-        for char in chars:
-            if char not in vocab_to_int:
-                vocab_to_int[char] = count
-                count += 1
+        with open(text_file) as f:
+            for chars in iter(lambda: f.read(chunk_size), ''):
+                # only the chars not seen yet, in order of appearance
+                for char in sorted(set(chars).difference(vocab_to_int), key=chars.index):
+                    vocab_to_int[char] = count
+                    count += 1
 
         # Add special tokens to vocab_to_int
         codes = ['\t','\n', '<unk>', '<eos>']
@@ -57,6 +56,15 @@ class Vocabulary(object):
             
         return vocab_to_int, int_to_vocab    
         
+    def save(self, vocabulary_file):
+        """
+            Saves the vocabulary, to be loaded with
+            Vocabulary(vocabulary_file) instead of built again
+        """
+        with open(vocabulary_file, 'w') as f:
+            json.dump(self.vocabulary, f)
+        self.vocabulary_file = vocabulary_file
+
     def size(self):
         """
             Gets the size of the vocabulary
@@ -143,20 +151,27 @@ class Data(object):
                 #print(row[1])
                 self.targets.append(row[1])
 
-    def transform(self):
+    def transform(self, sparse=False):
         """
             Transforms the data as necessary
+            :param sparse: keep the targets as integers, (samples, padding, 1)
+                           of uint8 or int16, for sparse_categorical_crossentropy,
+                           instead of one hot floats
         """
         # @TODO: use `pool.map_async` here?
         self.inputs = np.array(list(
             map(self.input_vocabulary.string_to_int, self.inputs)))
-        self.targets = map(self.output_vocabulary.string_to_int, self.targets)
-        self.targets = np.array(
-            list(map(
-                lambda x: to_categorical(
-                    x,
-                    num_classes=self.output_vocabulary.size()),
-                self.targets)))
+        self.targets = np.array(list(
+            map(self.output_vocabulary.string_to_int, self.targets)),
+            dtype='uint8' if self.output_vocabulary.size() <= 256 else 'int16')
+        if sparse:
+            self.targets = self.targets[:, :, np.newaxis]
+        else:
+            # one call for all the rows, rather than one per row
+            self.targets = to_categorical(
+                self.targets,
+                num_classes=self.output_vocabulary.size()).reshape(
+                    self.targets.shape + (self.output_vocabulary.size(),))
 
         assert len(self.inputs.shape) == 2, 'Inputs could not properly be encoded'
         assert len(self.targets.shape) == 3, 'Targets could not properly be encoded'
@@ -42,8 +42,8 @@ def main(args):
     validation = Data(args.validation_data, input_vocab, output_vocab, args.delimiter)
     training.load()
     validation.load()
-    training.transform()
-    validation.transform()
+    training.transform(args.sparse)
+    validation.transform(args.sparse)
 
     print('Datasets Loaded.')
     print('Compiling Model.')
@@ -58,7 +58,7 @@ def main(args):
 
     model.summary()
     model.compile(optimizer='adam',
-                  loss='categorical_crossentropy',
+                  loss='sparse_categorical_crossentropy' if args.sparse else 'categorical_crossentropy',
                   metrics=['accuracy', all_acc])
     print('Model Compiled.')
     print('Training. Ctrl+C to end early.')
@@ -117,6 +117,9 @@ if __name__ == '__main__':
     named_args.add_argument('-b', '--batch-size', metavar='|',
                             help="""Location of validation data""",
                             required=False, default=32, type=int)
+
+    named_args.add_argument('-s', '--sparse', action='store_true',
+                            help="""Integer targets and sparse_categorical_crossentropy, not one hot""")
     args = parser.parse_args()
     print(args)
 
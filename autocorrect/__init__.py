@@ -13,14 +13,121 @@ Author: Jonas McCallum
 https://github.com/foobarmus/autocorrect
 
 """
+import numpy as np
+
 from autocorrect.nlp_parser import NLP_COUNTS
-from autocorrect.word import Word, common, exact, known, get_case
+from autocorrect.word import Word, common, exact, known, get_case, get_cases
+from autocorrect.index import backend, near, use_backend
+from autocorrect.cache import MAXSIZE, SpellCache
+from autocorrect.batch import preload, spell_many, spell_text
+from autocorrect.domains import Domain, add_domain, remove_domain
+from autocorrect.domains import current, refresh, LISTENERS
+from autocorrect.confusions import LETTERS, MIN_PART, TYPO, Confusions
 
-def spell(word):
-    """most likely correction for everything up to a double typo"""
-    w = Word(word)
-    candidates = (common([word]) or exact([word]) or known([word]) or
-                  known(w.typos()) or common(w.double_typos()) or
+_CACHE = None
+_CONFUSIONS = None
+
+def _confused(word, layers):
+    """
+    {candidate: channel probability} of the known words, and
+    of the splits into likely words, OCR could have misread as
+    word, and of the typos of word near() finds, TYPO likely
+    per typo. No split is more likely than a typo.
+
+    """
+    channel = _CONFUSIONS.edits(word)
+    found = {w: channel[w] for w in known(channel) | layers.known(channel)}
+    parts = {edit: edit.split(' ') for edit in channel if ' ' in edit}
+    known_parts = {p for split in parts.values() for p in split}
+    known_parts = ({p for p in known(known_parts) | layers.known(known_parts)
+                    if len(p) >= MIN_PART} |
+                   common(known_parts) | layers.common(known_parts))
+    known_parts = {p for p in known_parts if len(p) > 1 or p in LETTERS}
+    for edit, split in parts.items():
+        if all(p in known_parts for p in split):
+            found[edit] = min(channel[edit], TYPO)
+    typos, weight = known(near(word, 1)) | layers.near(word, 1), TYPO
+    if not typos:
+        typos = common(near(word, 2)) | layers.near(word, 2)
+        weight = TYPO ** 2
+    for typo in typos:
+        found[typo] = max(found.get(typo, 0), weight)
+    return found
+
+def _noisy(word, layers):
+    """
+    likeliest of _confused(word) by count times channel
+    probability, a split counting as often as its parts
+    would come up together by chance, so never if one of
+    them hasn't been seen and seldom if they're short.
+    With no word to choose from, word is left as it is.
+
+    """
+    channel = _confused(word, layers)
+    words = [w for w in channel if ' ' not in w]
+    if not words:
+        return get_case(word, word)
+    splits = [w.split(' ') for w in channel if ' ' in w]
+    scores = dict(zip(words, layers.lookup(words, NLP_COUNTS) + 1))
+    for split in splits:
+        count = np.prod(layers.lookup(split, NLP_COUNTS) / NLP_COUNTS.total)
+        if count:
+            scores[' '.join(split)] = count * NLP_COUNTS.total
+    correction = max(scores, key=lambda w: scores[w] * channel[w])
+    if ' ' not in correction:
+        return get_case(word, correction)
+    start, cased = 0, []
+    for part in correction.split(' '):
+        # each part takes the case of the letters it stands for
+        cased.append(get_case(word[start:start + len(part)] or word, part))
+        start += len(part)
+    return ' '.join(cased)
+
+def _spell(word):
+    layers = current()
+    candidates = (common([word]) | layers.common([word]) or
+                  exact([word]) or
+                  known([word]) | layers.known([word]))
+    if not candidates and _CONFUSIONS is not None:
+        return _noisy(word, layers)
+    candidates = (candidates or
+                  known(near(word, 1)) | layers.near(word, 1) or
+                  common(near(word, 2)) | layers.near(word, 2) or
                   [word])
-    correction = max(candidates, key=NLP_COUNTS.get)
+    correction = layers.best(candidates, NLP_COUNTS)
     return get_case(word, correction)
+
+def spell(word):
+    """most likely correction for everything up to a double typo"""
+    if _CACHE is not None:
+        return _CACHE(word)
+    return _spell(word)
+
+def _forget():
+    if _CACHE is not None:
+        _CACHE.clear()
+
+LISTENERS.append(_forget)
+
+def use_cache(maxsize=MAXSIZE):
+    """
+    Memoize spell() in a SpellCache of maxsize
+    words and return it, for info(), warm() and
+    clear(). use_cache(None) turns it off.
+
+    """
+    global _CACHE
+    _CACHE = SpellCache(_spell, maxsize) if maxsize else None
+    return _CACHE
+
+def use_confusions(confusions):
+    """
+    Rank the likely OCR misreadings in confusions
+    (a Confusions table) with the generic typos.
+    use_confusions(None) turns it off.
+
+    """
+    global _CONFUSIONS
+    _CONFUSIONS = confusions
+    _forget()
+    return _CONFUSIONS
@@ -0,0 +1,153 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Correct a file, or stdin, line by line
+
+    python -m autocorrect ocr.txt > corrected.txt
+    zcat ocr.txt.gz | python -m autocorrect -p 32 > corrected.txt
+
+Lines are read in chunks of --chunk-lines and corrected by a
+pool forked once the word lists are loaded. At most --ahead
+chunks per process are in flight and the oldest is always
+written first, so output is in input order and memory stays
+flat however long the input is. Progress goes to stderr.
+
+Type `python -m autocorrect -h` for help with arguments.
+
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+import autocorrect
+from autocorrect.batch import fork_pool, preload, spell_text
+from autocorrect.confusions import Confusions
+
+CHUNK_LINES = 1024
+AHEAD = 2
+EVERY = 5.0
+
+def chunks(lines, size):
+    """lines => lists of up to size lines"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class Progress(object):
+    """lines and lines/sec, to stderr every `every` seconds"""
+
+    def __init__(self, every=EVERY, stream=sys.stderr):
+        self.every = every
+        self.stream = stream
+        self.lines = self.chars = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self, lines, chars):
+        self.lines += lines
+        self.chars += chars
+        now = time.perf_counter()
+        if self.every and now - self.last >= self.every:
+            self.last = now
+            self.report()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        print('{} lines, {:.1f} M chars, {:.0f} lines/sec'.format(
+            self.lines, self.chars / 1e6,
+            self.lines / elapsed if elapsed else 0), file=self.stream)
+
+def correct(lines, output, processes=1, chunk_lines=CHUNK_LINES,
+            ahead=AHEAD, progress=None):
+    """write every line of lines, corrected, to output, in order"""
+    progress = progress or Progress(every=0)
+    if processes == 1:
+        for chunk in chunks(lines, chunk_lines):
+            text = ''.join(chunk)
+            output.write(spell_text(text))
+            progress.update(len(chunk), len(text))
+        return progress
+    preload()
+    with fork_pool(processes) as pool:
+        pending = deque()
+
+        def write():
+            size, length, result = pending.popleft()
+            output.write(result.get())
+            progress.update(size, length)
+
+        for chunk in chunks(lines, chunk_lines):
+            text = ''.join(chunk)
+            pending.append((len(chunk), len(text),
+                            pool.apply_async(spell_text, (text,))))
+            if len(pending) >= processes * ahead:
+                write()
+        while pending:
+            write()
+    return progress
+
+def main(args):
+    autocorrect.use_backend(args.backend)
+    if args.cache:
+        autocorrect.use_cache(args.cache)
+    if args.confusions:
+        autocorrect.use_confusions(Confusions.from_json(args.confusions))
+    processes = args.processes or os.cpu_count()
+    progress = Progress(args.every)
+    source = (sys.stdin if args.input == '-' else
+              open(args.input, encoding='utf8', newline=''))
+    with source:
+        correct(source, sys.stdout, processes, args.chunk_lines,
+                args.ahead, progress)
+    sys.stdout.flush()
+    progress.report()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m autocorrect')
+    named_args = parser.add_argument_group('named arguments')
+
+    parser.add_argument('input', nargs='?', default='-',
+                        help="""File to correct, - for stdin""")
+
+    named_args.add_argument('-p', '--processes', metavar='|',
+                            help="""Worker processes, 0 for one per core""",
+                            required=False, default=0, type=int)
+
+    named_args.add_argument('-c', '--chunk-lines', metavar='|',
+                            help="""Lines handed to a worker at a time""",
+                            required=False, default=CHUNK_LINES, type=int)
+
+    named_args.add_argument('-a', '--ahead', metavar='|',
+                            help="""Chunks in flight per worker""",
+                            required=False, default=AHEAD, type=int)
+
+    named_args.add_argument('-k', '--backend', metavar='|',
+                            help="""Candidate backend: deletes, trie or typos""",
+                            required=False, default='deletes')
+
+    named_args.add_argument('-m', '--cache', metavar='|',
+                            help="""Words cached per worker, 0 for none""",
+                            required=False, default=0, type=int)
+
+    named_args.add_argument('-o', '--confusions', metavar='|',
+                            help="""OCR confusion table saved by Confusions.to_json""",
+                            required=False, default=None)
+
+    named_args.add_argument('-e', '--every', metavar='|',
+                            help="""Seconds between progress reports, 0 for none""",
+                            required=False, default=EVERY, type=float)
+    args = parser.parse_args()
+
+    main(args)
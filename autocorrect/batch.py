@@ -0,0 +1,72 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Batch spelling functions
+
+Repeated words are corrected once per batch. With
+processes > 1 the unique words are shared out to a
+pool forked after every word list has been loaded,
+so the workers read the parent's copy instead of
+loading their own.
+
+"""
+import re
+from multiprocessing import get_context
+
+import autocorrect
+from autocorrect.index import near
+from autocorrect.nlp_parser import NLP_WORDS, NLP_COUNTS
+from autocorrect.word import KNOWN_WORDS
+from autocorrect.word_lists import LOWERCASE, CASE_MAPPED
+from autocorrect.word_lists import MIXED_CASE, LOWERED, CASE_RESTORED
+
+CHUNKSIZE = 256
+SPACE = re.compile(r'(\s+)')
+
+def preload():
+    """load every word list and the index now rather than on first use"""
+    for words in (NLP_WORDS, NLP_COUNTS, KNOWN_WORDS, LOWERCASE,
+                  CASE_MAPPED, MIXED_CASE, LOWERED, CASE_RESTORED):
+        words.value()
+    near('', 0)
+
+def fork_pool(processes):
+    """a Pool that forks, where it can, so its workers share the loaded word lists"""
+    try:
+        context = get_context('fork')
+    except ValueError:
+        context = get_context()
+    return context.Pool(processes)
+
+def spell_many(words, processes=1, chunksize=CHUNKSIZE):
+    """
+    ['Teh', 'teh', 'Teh'] => ['The', 'the', 'The']
+
+    processes=None uses every core.
+
+    """
+    words = list(words)
+    unique = list(dict.fromkeys(words))
+    if processes == 1 or len(unique) <= chunksize:
+        corrections = [autocorrect.spell(word) for word in unique]
+    else:
+        preload()
+        with fork_pool(processes) as pool:
+            corrections = pool.map(autocorrect.spell, unique, chunksize)
+    corrected = dict(zip(unique, corrections))
+    return [corrected[word] for word in words]
+
+def spell_text(text, processes=1, chunksize=CHUNKSIZE):
+    """'Teh  quick\\nbrwn fox' => 'The  quick\\nbrown fox'"""
+    parts = SPACE.split(text)
+    words = [word for word in parts[::2] if word]
+    corrections = iter(spell_many(words, processes, chunksize))
+    parts[::2] = [next(corrections) if word else word
+                  for word in parts[::2]]
+    return ''.join(parts)
@@ -0,0 +1,76 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Least recently used memo for spell()
+
+Keys are the raw tokens, so 'Provider' and 'provider'
+are cached separately and get_case() still applies.
+
+"""
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+MAXSIZE = 65536
+
+CacheInfo = namedtuple('CacheInfo',
+                       'hits misses evictions size maxsize')
+
+class SpellCache(object):
+    """bounded memo of word => correction"""
+
+    def __init__(self, spell, maxsize=MAXSIZE):
+        self.spell = spell
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __call__(self, word):
+        with self.lock:
+            try:
+                correction = self.results[word]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.results.move_to_end(word)
+                self.hits += 1
+                return correction
+        correction = self.spell(word)
+        self._store(word, correction)
+        return correction
+
+    def _store(self, word, correction):
+        with self.lock:
+            self.results[word] = correction
+            self.results.move_to_end(word)
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+                self.evictions += 1
+
+    def warm(self, words):
+        """correct words ahead of time, without counting misses"""
+        for word in words:
+            if word not in self.results:
+                self._store(word, self.spell(word))
+
+    def clear(self):
+        """drop every result and reset the counters"""
+        with self.lock:
+            self.results.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """CacheInfo(hits, misses, evictions, size, maxsize)"""
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             len(self.results), self.maxsize)
+
+    def hit_rate(self):
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
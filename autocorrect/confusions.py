@@ -0,0 +1,174 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+OCR confusion channel
+
+Word._replaces and Word._inserts try every letter at every
+position, but tesseract's mistakes are anything but uniform:
+'rn' for 'm', '1' for 'l', 'f' for '/', dropped spaces...
+A Confusions table holds P(observed | intended) for such
+character and multi-character substitutions, learned from
+OCR/GT pairs files, and edits() only undoes the likely
+ones, ranked by that channel probability.
+
+    confusions = Confusions.from_pairs('all_ocr_data.txt')
+    autocorrect.use_confusions(confusions)
+
+"""
+import json
+from collections import defaultdict
+
+WIDTH = 2
+TOP = 8
+THRESHOLD = 1e-4
+MIN_COUNT = 2
+# channel probability of any other typo, i.e. of a near() word,
+# and the most a split is given; shorter split parts have to be
+# in NLP_WORDS, and a one letter part can only be 'a' or 'i'
+TYPO = 1e-4
+MIN_PART = 3
+LETTERS = {'a', 'i'}
+
+# seen in RESULTS.md, used until a table is learned
+OCR = {('rn', 'm'): 0.05, ('1', 'l'): 0.02, ('f', '/'): 0.02,
+       ('ti', 'h'): 0.01, ('', ' '): 0.01, (' ', ''): 0.01,
+       ('cl', 'd'): 0.01, ('vv', 'w'): 0.01, ('ii', 'u'): 0.01,
+       ('0', 'o'): 0.01, ('l', 'i'): 0.01, ('e', 'c'): 0.01}
+
+def align(ocr, gt):
+    """
+    Levenshtein alignment of two strings, adjacent
+    edits merged into one.
+
+    'rnat', 'mat' => [('m', 'rn'), ('a', 'a'), ('t', 't')]
+
+    """
+    rows = [list(range(len(ocr) + 1))]
+    for i in range(1, len(gt) + 1):
+        row = [i]
+        for j in range(1, len(ocr) + 1):
+            row.append(min(rows[i - 1][j - 1] + (gt[i - 1] != ocr[j - 1]),
+                           rows[i - 1][j] + 1, row[j - 1] + 1))
+        rows.append(row)
+    columns, i, j = [], len(gt), len(ocr)
+    while i or j:
+        if i and j and rows[i][j] == rows[i - 1][j - 1] + (gt[i - 1] != ocr[j - 1]):
+            columns.append((gt[i - 1], ocr[j - 1]))
+            i, j = i - 1, j - 1
+        elif i and rows[i][j] == rows[i - 1][j] + 1:
+            columns.append((gt[i - 1], ''))
+            i -= 1
+        else:
+            columns.append(('', ocr[j - 1]))
+            j -= 1
+    merged = []
+    for intended, observed in reversed(columns):
+        if (merged and intended != observed and
+                merged[-1][0] != merged[-1][1]):
+            merged[-1] = (merged[-1][0] + intended, merged[-1][1] + observed)
+        else:
+            merged.append((intended, observed))
+    return merged
+
+class Confusions(object):
+    """{(observed, intended): P(observed | intended)} => edit generator"""
+
+    def __init__(self, weights, top=TOP, threshold=THRESHOLD):
+        self.threshold = threshold
+        table = defaultdict(list)
+        for (observed, intended), p in weights.items():
+            table[observed].append((intended, p))
+        self.table = {o: sorted(e, key=lambda e: -e[1])[:top]
+                      for o, e in table.items()}
+        self.width = max(map(len, self.table), default=0)
+
+    @classmethod
+    def learn(cls, pairs, min_count=MIN_COUNT, **kwargs):
+        """[('rnat', 'mat'), ...] => Confusions"""
+        edits = defaultdict(int)
+        texts = []
+        for ocr, gt in pairs:
+            ocr, gt = ocr.lower(), gt.lower()
+            texts.append(gt)
+            for intended, observed in align(ocr, gt):
+                if intended == observed:
+                    continue
+                if len(intended) > WIDTH or len(observed) > WIDTH:
+                    continue
+                edits[observed, intended] += 1
+        totals = {}
+        for _, intended in edits:
+            if intended not in totals:
+                totals[intended] = sum(t.count(intended) if intended
+                                       else len(t) + 1 for t in texts)
+        return cls({e: n / totals[e[1]] for e, n in edits.items()
+                    if n >= min_count and totals[e[1]]}, **kwargs)
+
+    @classmethod
+    def from_pairs(cls, filename, delimiter='\t', ocr_index=0, gt_index=1,
+                   limit=None, **kwargs):
+        """'rnat\\tmat\\n...' => Confusions"""
+        def pairs():
+            with open(filename, encoding='utf8') as f:
+                for n, row in enumerate(f):
+                    if n == limit:
+                        break
+                    columns = row.rstrip('\n').split(delimiter)
+                    if len(columns) == 2:
+                        yield columns[ocr_index], columns[gt_index]
+        return cls.learn(pairs(), **kwargs)
+
+    @classmethod
+    def from_json(cls, filename, **kwargs):
+        """[['rn', 'm', 0.05], ...] => Confusions"""
+        with open(filename, encoding='utf8') as f:
+            return cls({(o, i): p for o, i, p in json.load(f)}, **kwargs)
+
+    def to_json(self, filename):
+        with open(filename, 'w', encoding='utf8') as f:
+            json.dump([[o, i, p] for o, edits in self.table.items()
+                       for i, p in edits], f, indent=1)
+
+    def edits(self, word, depth=2):
+        """
+        Words that could have been misread as word, up to
+        depth confusions away, with their channel probability.
+
+        'arnerican' => {'american': 0.05, ...}
+
+        """
+        word = word.lower()
+        found = {}
+        edge = {word: 1.0}
+        for _ in range(depth):
+            edge = self._edits(edge, found)
+        found.pop(word, None)
+        return found
+
+    def _edits(self, edge, found):
+        new = {}
+        for word, p in edge.items():
+            for i in range(len(word) + 1):
+                for n in range(min(self.width, len(word) - i) + 1):
+                    for intended, q in self.table.get(word[i:i + n], ()):
+                        score = p * q
+                        edit = word[:i] + intended + word[i + n:]
+                        # a space at either end splits off nothing
+                        if edit[:1] == ' ' or edit[-1:] == ' ':
+                            continue
+                        if score >= self.threshold and score > found.get(edit, 0):
+                            found[edit] = new[edit] = score
+        return new
+
+    def ranked(self, word, depth=2):
+        """edits(word) most likely first"""
+        edits = self.edits(word, depth)
+        return sorted(edits, key=lambda e: -edits[e])
+
+DEFAULT = Confusions(OCR)
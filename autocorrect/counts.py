@@ -0,0 +1,80 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Compact word counts
+
+A sorted fixed width byte string table and a parallel
+uint32 array replace the two entries per word Zero dict,
+and any number of words are looked up in one searchsorted.
+The odd word longer than WIDTH bytes is kept in a plain
+dict so it doesn't widen every row of the table.
+
+"""
+import numpy as np
+
+WIDTH = 24
+
+class Counts(object):
+    """sorted words => counts, zero for unknown words"""
+
+    def __init__(self, words, counts):
+        """words as sorted utf-8 bytes, counts in the same order"""
+        counts = np.asarray(counts, dtype=np.uint32)
+        fits = np.array([len(w) <= WIDTH for w in words], dtype=bool)
+        self.words = np.array([w for w, f in zip(words, fits) if f],
+                              dtype=bytes)
+        self.counts = counts[fits]
+        self.long = {w: int(c) for w, c, f in zip(words, counts, fits)
+                     if not f}
+        self.total = int(counts.sum(dtype=np.uint64))
+
+    @classmethod
+    def from_dict(cls, counts):
+        """{'the': 2, 'The': 1} => Counts"""
+        words = sorted(counts)
+        return cls([w.encode('utf-8') for w in words],
+                   [counts[w] for w in words])
+
+    def __len__(self):
+        return len(self.words) + len(self.long)
+
+    def __contains__(self, word):
+        return bool(self.lookup([word])[0])
+
+    def __getitem__(self, word):
+        return self.get(word)
+
+    def get(self, word):
+        return int(self.lookup([word])[0])
+
+    def lookup(self, words):
+        """['the', 'teh'] => array([80030, 0])"""
+        words = [w.encode('utf-8') for w in words]
+        # b'' never hits: a NUL would be dropped by the 'S' dtype
+        probe = np.array([w if len(w) <= WIDTH and b'\0' not in w else b''
+                          for w in words], dtype=bytes)
+        found = np.zeros(len(probe), dtype=np.uint32)
+        if len(self.words):
+            at = np.searchsorted(self.words, probe)
+            at[at == len(self.words)] = 0
+            hit = (self.words[at] == probe) & (probe != b'')
+            found[hit] = self.counts[at[hit]]
+        for i, word in enumerate(words):
+            if len(word) > WIDTH:
+                found[i] = self.long.get(word, 0)
+        return found
+
+    def best(self, words):
+        """
+        Most common of words, the first one on a tie,
+        i.e. max(words, key=counts.get)
+
+        """
+        words = list(words)
+        return words[int(np.argmax(self.lookup(words)))]
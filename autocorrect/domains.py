@@ -0,0 +1,175 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Domain dictionaries layered over the word lists
+
+Each Domain tallies the words of a term list (the medical
+terms JSON, the pipe separated accident terms, ...) times
+its weight, and files them in a DeleteIndex of its own, so
+adding one never touches the base index.
+
+spell() reads the layers through current(). add_domain(),
+remove_domain() and refresh() build the replacement first
+and then swap it in with a single assignment, so a running
+worker sees either the old layers or the new ones.
+
+"""
+import json, logging, os, re
+from threading import Lock
+
+import numpy as np
+
+from autocorrect.index import DeleteIndex
+from autocorrect.utils import RE, zero_default_dict
+
+LOG = logging.getLogger(__name__)
+
+class Domain(object):
+    """term list => weighted word counts and their own index"""
+
+    def __init__(self, name, words, weight=1, source=None,
+                 delimiter=None):
+        self.name = name
+        self.weight = weight
+        self.source = source
+        self.delimiter = delimiter
+        self.mtime = os.path.getmtime(source) if source else None
+        words = list(words)
+        self.counts = zero_default_dict()
+        for word in words:
+            self.counts[word.lower()] += weight
+            self.counts[word] += weight
+        self.words = set(words)
+        self.lowered = {w.lower() for w in self.words}
+        self.index = DeleteIndex(self.lowered)
+
+    @classmethod
+    def from_terms(cls, filename, name=None, weight=1, delimiter='|'):
+        """'Fracture|Sprain\\nConcussion' => Domain"""
+        with open(filename, encoding='utf8') as f:
+            words = re.findall(RE, f.read().replace(delimiter, ' '))
+        return cls(name or filename, words, weight, filename, delimiter)
+
+    @classmethod
+    def from_json(cls, filename, name=None, weight=1):
+        """{'Chest X-Ray': ..., 'MRI': ...} => Domain"""
+        with open(filename, encoding='utf8') as f:
+            terms = json.load(f)
+        words = re.findall(RE, ' '.join(terms))
+        return cls(name or filename, words, weight, filename)
+
+    def reload(self):
+        """the same domain read again from its source"""
+        if self.source.endswith('.json'):
+            return Domain.from_json(self.source, self.name, self.weight)
+        return Domain.from_terms(self.source, self.name, self.weight,
+                                 self.delimiter)
+
+
+class Layers(object):
+    """an immutable stack of domains, queried like the base lists"""
+
+    def __init__(self, domains=()):
+        self.domains = tuple(domains)
+        self.words = set().union(*(d.words for d in self.domains))
+        self.lowered = set().union(*(d.lowered for d in self.domains))
+        self.counts = zero_default_dict()
+        for domain in self.domains:
+            for word, count in domain.counts.items():
+                self.counts[word] += count
+
+    def common(self, words):
+        """as word.common(), over the domain words"""
+        return set(words) & self.words
+
+    def known(self, words):
+        """as word.known(), over the domain words"""
+        return {w.lower() for w in words} & self.lowered
+
+    def near(self, word, max_distance):
+        """as index.near(), over the domain words"""
+        return set().union(*(d.index.lookup(word.lower(), max_distance)
+                             for d in self.domains))
+
+    def lookup(self, words, counts):
+        """counts.lookup(words), adding the domain counts"""
+        scores = counts.lookup(words).astype(float)
+        scores += [self.counts[w] for w in words]
+        return scores
+
+    def best(self, words, counts, weights=None):
+        """
+        counts.best(words), adding the domain counts,
+        and times weights (say channel probabilities)
+        if given, one per word
+
+        """
+        if not self.counts and weights is None:
+            return counts.best(words)
+        words = list(words)
+        scores = self.lookup(words, counts)
+        if weights is not None:
+            scores = (scores + 1) * weights
+        return words[int(np.argmax(scores))]
+
+_LAYERS = Layers()
+_LOCK = Lock()
+LISTENERS = []
+
+def current():
+    """the layers in force, to be read once per call"""
+    return _LAYERS
+
+def _swap(domains):
+    global _LAYERS
+    _LAYERS = Layers(domains)
+    for listener in LISTENERS:
+        listener()
+    return _LAYERS
+
+def add_domain(domain):
+    """add domain, or replace the one with the same name"""
+    with _LOCK:
+        return _swap([d for d in _LAYERS.domains
+                      if d.name != domain.name] + [domain])
+
+def remove_domain(name):
+    with _LOCK:
+        return _swap([d for d in _LAYERS.domains if d.name != name])
+
+def _changed(domain):
+    try:
+        return domain.source and (os.path.getmtime(domain.source) !=
+                                  domain.mtime)
+    except OSError:
+        return False
+
+def _reload(domain):
+    """domain read again, or kept if its file can't be read yet"""
+    try:
+        reloaded = domain.reload()
+    except (OSError, ValueError) as e:
+        # say a weekly file half written, JSONDecodeError is a ValueError
+        LOG.warning('keeping domain %s, %s could not be read: %s',
+                    domain.name, domain.source, e)
+        return domain
+    if not reloaded.words:
+        LOG.warning('keeping domain %s, %s has no words',
+                    domain.name, domain.source)
+        return domain
+    return reloaded
+
+def refresh():
+    """reload every domain whose source file has changed"""
+    with _LOCK:
+        domains = [_reload(d) if _changed(d) else d
+                   for d in _LAYERS.domains]
+        if any(a is not b for a, b in zip(domains, _LAYERS.domains)):
+            return _swap(domains)
+        return _LAYERS
@@ -0,0 +1,290 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Symmetric delete index
+
+Every dictionary word is filed under the strings left by
+deleting up to two letters from its first PREFIX letters.
+A word is then within two typos of the query only if one
+of those keys is also a delete variant of the query, so
+candidates are found without generating any insert,
+replace or transpose strings.
+
+near() can also be served by the packed trie in trie.py
+or by the original Word.typos() set intersections, see
+use_backend() and compare(). In shared mode (see
+snapshot.py) the delete index and the trie are read from
+the snapshot, so the workers don't each build their own.
+
+"""
+import time, tracemalloc
+
+from autocorrect.snapshot import SNAPSHOT
+from autocorrect.trie import Trie
+from autocorrect.word import KNOWN_WORDS, Word, search
+
+PREFIX = 7
+MAX_DISTANCE = 2
+
+def deletes(word, max_distance):
+    """'the', 1 => {'the', 'he', 'te', 'th'}"""
+    found = edge = {word}
+    for _ in range(max_distance):
+        edge = {w[:i] + w[i + 1:]
+                for w in edge for i in range(len(w))}
+        found = found | edge
+    return found
+
+def distance(word, other):
+    """
+    Damerau-Levenshtein distance, i.e. the
+    fewest deletes, transposes, replaces and
+    inserts that turn word into other.
+
+    'teh', 'the' => 1
+    'ca', 'abc' => 2
+
+    """
+    limit = len(word) + len(other)
+    rows = [[limit] * (len(other) + 2)]
+    rows += [[limit, i] + [0] * len(other)
+             for i in range(len(word) + 1)]
+    rows[1] = [limit] + list(range(len(other) + 1))
+    last_row = {}
+    for i in range(1, len(word) + 1):
+        last_col = 0
+        for j in range(1, len(other) + 1):
+            k = last_row.get(other[j - 1], 0)
+            l = last_col
+            if word[i - 1] == other[j - 1]:
+                cost = 0
+                last_col = j
+            else:
+                cost = 1
+            rows[i + 1][j + 1] = min(rows[i][j] + cost,
+                                     rows[i + 1][j] + 1,
+                                     rows[i][j + 1] + 1,
+                                     rows[k][l] + (i - k - 1) +
+                                     1 + (j - l - 1))
+        last_row[word[i - 1]] = i
+    return rows[-1][-1]
+
+def within(word, other, max_distance):
+    """
+    distance(word, other) <= max_distance, filling in only
+    the cells within max_distance of the diagonal: a cell
+    further off is over max_distance, and so is any path
+    through it. No row of the matrix costs less than the
+    row above, so the first row over max_distance ends it.
+
+    'teh', 'the', 1 => True
+    'ca', 'abc', 1 => False
+
+    """
+    # a shared prefix or suffix never adds to the distance
+    shorter = min(len(word), len(other))
+    start = stop = 0
+    while start < shorter and word[start] == other[start]:
+        start += 1
+    while (stop < shorter - start and
+           word[-1 - stop] == other[-1 - stop]):
+        stop += 1
+    word = word[start:len(word) - stop]
+    other = other[start:len(other) - stop]
+    if abs(len(word) - len(other)) > max_distance:
+        return False
+    if max(len(word), len(other)) <= max_distance:
+        return True
+    over = max_distance + 1
+    rows = [[over] * (len(other) + 2),
+            [over] + [min(j, over) for j in range(len(other) + 1)]]
+    last_row = {}
+    for i in range(1, len(word) + 1):
+        above, row = rows[i], [over, min(i, over)] + [over] * len(other)
+        rows.append(row)
+        char = word[i - 1]
+        low = max(1, i - max_distance)
+        high = min(len(other), i + max_distance)
+        last_col = other.rfind(char, 0, low - 1) + 1
+        for j in range(low, high + 1):
+            if other[j - 1] == char:
+                row[j + 1] = above[j]
+                last_col = j
+                continue
+            cost = min(above[j], above[j + 1], row[j]) + 1
+            k = last_row.get(other[j - 1], 0)
+            if k and last_col:
+                cost = min(cost, rows[k][last_col] + i - k + j - last_col - 1)
+            row[j + 1] = cost
+        if min(row[low + 1:high + 2]) > max_distance:
+            return False
+        last_row[char] = i
+    return rows[-1][-1] <= max_distance
+
+class DeleteIndex(object):
+    """words filed under their prefix deletes"""
+
+    def __init__(self, words, max_distance=MAX_DISTANCE,
+                 prefix=PREFIX):
+        self.max_distance = max_distance
+        self.prefix = prefix
+        self.table = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        """file word under each of its deletes"""
+        for key in deletes(word[:self.prefix], self.max_distance):
+            self.table.setdefault(key, []).append(word)
+
+    def candidates(self, keys):
+        """words filed under any of keys"""
+        return set().union(*(self.table.get(key, ()) for key in keys))
+
+    def lookup(self, word, max_distance=None):
+        """indexed words within max_distance typos of word"""
+        if max_distance is None:
+            max_distance = self.max_distance
+        found = set()
+        keys = deletes(word[:self.prefix], max_distance)
+        for match in self.candidates(keys):
+            if (abs(len(match) - len(word)) <= max_distance and
+                    within(word, match, max_distance)):
+                found.add(match)
+        return found
+
+class SharedDeleteIndex(DeleteIndex):
+    """a DeleteIndex read from the snapshot, see views.SortedPostings"""
+
+    def __init__(self, table, max_distance=MAX_DISTANCE, prefix=PREFIX):
+        self.max_distance = max_distance
+        self.prefix = prefix
+        self.table = table
+
+    def candidates(self, keys):
+        return self.table.union(keys)
+
+class Typos(object):
+    """
+    Word.typos() intersected with the words, and double
+    typos streamed through search(). Set max_candidates
+    or timeout to bound the double typo search; complete
+    then tells whether the last lookup searched every
+    double typo, and cut_short counts the lookups that
+    did not.
+
+    """
+    max_candidates = None
+    timeout = None
+
+    def __init__(self, words):
+        self.words = set(words)
+        self.complete = True
+        self.cut_short = 0
+
+    def lookup(self, word, max_distance=MAX_DISTANCE):
+        w = Word(word)
+        found = {word.lower()} & self.words
+        self.complete = True
+        if max_distance > 0:
+            found |= w.typos() & self.words
+        if max_distance > 1:
+            result = search(word, self.words, self.max_candidates,
+                            self.timeout)
+            found |= result.words
+            self.complete = result.complete
+            self.cut_short += not result.complete
+        return found
+
+BACKENDS = {'deletes': DeleteIndex, 'trie': Trie, 'typos': Typos}
+_BACKEND = 'deletes'
+_INDEXES = {}
+
+def use_backend(name):
+    """'deletes' (default), 'trie' or 'typos'"""
+    global _BACKEND
+    if name not in BACKENDS:
+        raise ValueError('unknown backend {!r}, expected one of {}'.format(
+            name, ', '.join(sorted(BACKENDS))))
+    _BACKEND = name
+
+def _index(name):
+    """
+    backend over the lower case known words, built on
+    first use, or read from the snapshot in shared mode
+
+    """
+    try:
+        return _INDEXES[name]
+    except KeyError:
+        index = _mapped(name)
+        if index is None:
+            index = BACKENDS[name]({w for w in KNOWN_WORDS if w.islower()})
+        return _INDEXES.setdefault(name, index)
+
+def _mapped(name):
+    """the snapshot's copy of backend name, if shared"""
+    if SNAPSHOT is None or not SNAPSHOT.shared:
+        return None
+    if name == 'deletes':
+        return SharedDeleteIndex(SNAPSHOT.postings('DELETES', 'KNOWN_WORDS'))
+    if name == 'trie':
+        return SNAPSHOT.trie('TRIE')
+    return None
+
+def backend():
+    """
+    the index near() uses, e.g. to read
+    backend().complete after a near() call
+    with the 'typos' backend
+
+    """
+    return _index(_BACKEND)
+
+def near(word, max_distance=MAX_DISTANCE):
+    """
+    Lower case known words up to max_distance
+    typos away from word, i.e. what known() and
+    common() keep from Word(word).typos() and
+    Word(word).double_typos().
+
+    """
+    return _index(_BACKEND).lookup(word.lower(), max_distance)
+
+def compare(queries, max_distance=MAX_DISTANCE, names=None):
+    """
+    Build each backend and time near() over queries.
+
+    => {'trie': {'build_seconds': 9.1, 'memory_mb': 14.2,
+                 'lookup_us': 850.0}, ...}
+
+    memory_mb is what tracemalloc sees allocated by the
+    build (and build_seconds includes its overhead),
+    lookup_us is the mean time per query.
+
+    """
+    words = {w for w in KNOWN_WORDS if w.islower()}
+    queries = [q.lower() for q in queries]
+    report = {}
+    for name in names or sorted(BACKENDS):
+        tracemalloc.start()
+        start = time.perf_counter()
+        index = BACKENDS[name](words)
+        built = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for query in queries:
+            index.lookup(query, max_distance)
+        elapsed = time.perf_counter() - start
+        report[name] = {'build_seconds': built,
+                        'memory_mb': memory / 2 ** 20,
+                        'lookup_us': 1e6 * elapsed / max(len(queries), 1)}
+        del index
+    return report
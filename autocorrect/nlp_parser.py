@@ -13,15 +13,35 @@ Author: Jonas McCallum
 https://github.com/foobarmus/autocorrect
 
 """
-from autocorrect.utils import words_from_archive, zero_default_dict
+from autocorrect.counts import Counts
+from autocorrect.snapshot import SNAPSHOT
+from autocorrect.utils import Lazy, archive_words, map_words
+from autocorrect.utils import zero_default_dict
 
-def parse(lang_sample):
-    """tally word popularity using novel extracts, etc"""
-    words = words_from_archive(lang_sample, include_dups=True)
-    counts = zero_default_dict()
+def tally(words):
+    """stream of words => set of words, counts"""
+    unique, counts = set(), zero_default_dict()
     for word in words:
+        unique.add(word)
         counts[word.lower()] += 1
         counts[word] += 1
-    return set(words), counts
+    return unique, counts
+
+def parse(lang_sample):
+    """tally word popularity using novel extracts, etc"""
+    return tally(archive_words(lang_sample))
+
+def parse_corpus(filename):
+    """tally a plain text corpus, read through mmap"""
+    return tally(map_words(filename))
+
+def load():
+    """compiled tallies if there is a snapshot, else parse big.txt"""
+    if SNAPSHOT is not None:
+        return SNAPSHOT.set('NLP_WORDS'), SNAPSHOT.counts('NLP_COUNTS')
+    words, counts = parse('big.txt')
+    return words, Counts.from_dict(counts)
 
-NLP_WORDS, NLP_COUNTS = parse('big.txt')
+_NLP = Lazy(load)
+NLP_WORDS = Lazy(lambda: _NLP[0])
+NLP_COUNTS = Lazy(lambda: _NLP[1])
@@ -0,0 +1,293 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Compiled word list snapshot
+
+words.tar is parsed once by build() into a single binary
+file next to it. Importing autocorrect then maps that file
+instead of decoding the archive, and each word list is only
+unpacked the first time it is used.
+
+Layout (little endian):
+
+    MAGIC, VERSION, tar size, tar mtime (ns), section count
+    section directory: name, offset, length
+    sections, each aligned to 8 bytes
+
+A string section is a count n, n + 1 offsets and the sorted
+strings joined by newlines. A number section is uint32s.
+Sorted string sections also get a fixed width .table twin,
+see views.py. The near() indexes over the lower case known
+words are stored too: DELETES.keys (sorted strings), with
+DELETES.offsets into DELETES.postings, the KNOWN_WORDS rows
+filed under each key, for index.DeleteIndex, and TRIE.labels
+(utf-32), TRIE.first (uint32s) and TRIE.final (a byte per
+node) for trie.Trie.
+
+Build with:
+
+    python -c "from autocorrect.snapshot import build; build()"
+
+Shared mode: a Snapshot(path, shared=True) hands out views
+that read the lists in place instead of unpacking them. One
+loader process runs
+
+    python -c "from autocorrect.snapshot import publish; publish()"
+
+and every worker started with AUTOCORRECT_SHARED set to the
+path it prints maps that one copy, near() index included.
+
+"""
+import mmap, os, shutil, struct, sys
+from array import array
+
+import numpy as np
+
+from autocorrect.counts import Counts
+from autocorrect.trie import Trie
+from autocorrect.utils import PATH, BZ2, words_from_archive
+from autocorrect.views import Strings, SortedStrings, SortedMapping
+from autocorrect.views import SortedCounts, SortedPostings, table
+
+FILENAME = 'words.snapshot'
+MAGIC = b'ACSNAP\r\n'
+VERSION = 5
+HEADER = struct.Struct('<8sIQQI')
+ENTRY = struct.Struct('<24sQQ')
+ALIGN = 8
+SHM = '/dev/shm'
+
+def _numbers(values):
+    """uint32 array, little endian on disk"""
+    numbers = array('I', values)
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers
+
+def _strings(words):
+    """['ab', 'c'] => count, offsets, b'ab\\nc'"""
+    offsets, start = [], 0
+    for word in words:
+        offsets.append(start)
+        start += len(word.encode('utf-8')) + 1
+    offsets.append(start)
+    blob = '\n'.join(words).encode('utf-8')
+    return (struct.pack('<I', len(words)) +
+            _numbers(offsets).tobytes() + blob)
+
+def _source():
+    """size and mtime of words.tar, zeros if it is missing"""
+    try:
+        stat = os.stat(os.path.join(PATH, BZ2))
+    except OSError:
+        return 0, 0
+    return stat.st_size, stat.st_mtime_ns
+
+def write(path, sections):
+    """write {name: bytes} atomically, so mapped readers keep the old file"""
+    directory, offset = [], HEADER.size + ENTRY.size * len(sections)
+    for name, data in sections:
+        offset += -offset % ALIGN
+        directory.append((name, offset, len(data)))
+        offset += len(data)
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, *_source(), len(sections)))
+        for name, offset, length in directory:
+            f.write(ENTRY.pack(name.encode('ascii'), offset, length))
+        for (name, data), (_, offset, _) in zip(sections, directory):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp, path)
+
+def build(path=None):
+    """compile the archive word lists into a snapshot"""
+    from autocorrect.index import DeleteIndex
+    from autocorrect.nlp_parser import parse
+    nlp_words, nlp_counts = parse('big.txt')
+    case_mapped = words_from_archive('en_US_GB_CA_mixed.txt',
+                                     map_case=True)
+    lowercase = words_from_archive('en_US_GB_CA_lower.txt')
+    counted = sorted(nlp_counts)
+    lowered = sorted(case_mapped)
+    restored = [w for w in lowered if w not in lowercase]
+    known = sorted(lowercase | set(lowered) | nlp_words)
+    rows = {w: i for i, w in enumerate(known)}
+    deletes = DeleteIndex(w for w in known if w.islower()).table
+    keys = sorted(deletes)
+    offsets, postings = [0], []
+    for key in keys:
+        postings += [rows[w] for w in deletes[key]]
+        offsets.append(len(postings))
+    trie = Trie(w for w in known if w.islower())
+    sorted_lists = [
+        ('NLP_WORDS', sorted(nlp_words)),
+        ('NLP_COUNTS.keys', counted),
+        ('LOWERCASE', sorted(lowercase)),
+        ('CASE_MAPPED.keys', lowered),
+        ('MIXED_CASE', sorted(set(case_mapped.values()))),
+        ('LOWERED', lowered),
+        ('CASE_RESTORED.keys', restored),
+        ('KNOWN_WORDS', known),
+        ('DELETES.keys', keys),
+    ]
+    sections = [
+        ('NLP_COUNTS.values',
+         _numbers(nlp_counts[w] for w in counted).tobytes()),
+        ('CASE_MAPPED.values',
+         _strings([case_mapped[w] for w in lowered])),
+        ('CASE_RESTORED.values',
+         _strings([case_mapped[w] for w in restored])),
+        ('DELETES.offsets', _numbers(offsets).tobytes()),
+        ('DELETES.postings', _numbers(postings).tobytes()),
+        ('TRIE.labels', trie.labels.encode('utf-32-le')),
+        ('TRIE.first', _numbers(trie.first).tobytes()),
+        ('TRIE.final', bytes(trie.final)),
+    ]
+    for name, words in sorted_lists:
+        sections.append((name, _strings(words)))
+        sections.append((name + '.table', table(words)))
+    path = path or os.path.join(PATH, FILENAME)
+    write(path, sections)
+    return path
+
+class Snapshot(object):
+    """read-only view of a compiled snapshot"""
+
+    def __init__(self, path, shared=False):
+        self.shared = shared
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, mtime, count = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError('{} is not a snapshot'.format(path))
+        if version != VERSION:
+            raise ValueError('{} is version {}, expected {}'.format(
+                path, version, VERSION))
+        self.source = size, mtime
+        self.sections = {}
+        for i in range(count):
+            name, offset, length = ENTRY.unpack_from(
+                self.buffer, HEADER.size + ENTRY.size * i)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = (
+                offset, length)
+
+    def section(self, name):
+        """raw bytes of a section, without copying"""
+        offset, length = self.sections[name]
+        return memoryview(self.buffer)[offset:offset + length]
+
+    def numbers(self, name):
+        """uint32 section => array('I')"""
+        numbers = array('I')
+        numbers.frombytes(self.section(name))
+        if sys.byteorder == 'big':
+            numbers.byteswap()
+        return numbers
+
+    def _joined(self, name):
+        """string section => its newline joined strings, or None"""
+        data = self.section(name)
+        count, = struct.unpack_from('<I', data)
+        return data[4 + 4 * (count + 1):] if count else None
+
+    def strings(self, name):
+        """string section => list of str"""
+        joined = self._joined(name)
+        return str(joined, 'utf-8').split('\n') if joined else []
+
+    def sorted_strings(self, name):
+        """sorted string section => SortedStrings, read in place"""
+        return SortedStrings(self.section(name), self.section(name + '.table'))
+
+    def set(self, name):
+        if self.shared:
+            return self.sorted_strings(name)
+        return set(self.strings(name))
+
+    def mapping(self, name):
+        """NAME.keys and NAME.values => dict"""
+        if self.shared:
+            return SortedMapping(self.sorted_strings(name + '.keys'),
+                                 Strings(self.section(name + '.values')))
+        return dict(zip(self.strings(name + '.keys'),
+                        self.strings(name + '.values')))
+
+    def counts(self, name):
+        """NAME.keys and NAME.values => Counts, reading values in place"""
+        values = np.frombuffer(self.section(name + '.values'), dtype='<u4')
+        if self.shared:
+            return SortedCounts(self.sorted_strings(name + '.keys'), values)
+        joined = self._joined(name + '.keys')
+        return Counts(bytes(joined).split(b'\n') if joined else [], values)
+
+    def postings(self, name, words):
+        """
+        NAME.keys, NAME.offsets and NAME.postings => read-only
+        {key: [word, ...]}, the postings being rows of the
+        sorted string section words, all read in place
+
+        """
+        return SortedPostings(
+            self.sorted_strings(name + '.keys'),
+            np.frombuffer(self.section(name + '.offsets'), dtype='<u4'),
+            np.frombuffer(self.section(name + '.postings'), dtype='<u4'),
+            Strings(self.section(words)))
+
+    def trie(self, name):
+        """
+        NAME.labels, NAME.first and NAME.final => Trie,
+        reading first and final in place
+
+        """
+        labels = str(self.section(name + '.labels'), 'utf-32-le')
+        if sys.byteorder == 'big':
+            first = self.numbers(name + '.first')
+        else:
+            first = self.section(name + '.first').cast('I')
+        return Trie.from_arrays(labels, first, self.section(name + '.final'))
+
+def load(path=None):
+    """
+    Snapshot at path, or None if it is missing,
+    from another version or built from another
+    words.tar (going by its size and mtime), in
+    which case callers parse the archive instead.
+
+    """
+    path = path or os.path.join(PATH, FILENAME)
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    source = _source()
+    if source[0] and snapshot.source != source:
+        return None
+    return snapshot
+
+def publish(path=None):
+    """
+    Copy the snapshot into shared memory, building it
+    first if need be, and return the path for workers
+    to attach to with AUTOCORRECT_SHARED=path.
+
+    """
+    path = path or os.path.join(SHM if os.path.isdir(SHM) else PATH,
+                                'autocorrect.' + FILENAME)
+    local = os.path.join(PATH, FILENAME)
+    if load(local) is None:
+        build(local)
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    shutil.copyfile(local, tmp)
+    os.replace(tmp, path)
+    print(path)
+    return path
+
+SHARED = os.environ.get('AUTOCORRECT_SHARED')
+SNAPSHOT = Snapshot(SHARED, shared=True) if SHARED else load()
@@ -0,0 +1,137 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Packed trie walked with an edit distance automaton
+
+Nodes are numbered breadth first, so the children of a
+node are a run of consecutive edges and edge e always
+leads to node e + 1. The whole trie is then one label
+string, one array of first edges and one final flag per
+node, a few bytes per node, stored as is in the snapshot
+(see snapshot.py).
+
+lookup() walks it one banded Damerau-Levenshtein row per
+letter and drops a branch as soon as no cell of its row is
+within max_distance, so only prefixes of dictionary words
+are ever built.
+
+"""
+from array import array
+from collections import deque
+
+LIMIT = 1 << 16
+
+class Trie(object):
+    """'the', 'then', 'to' => t -> h -> e* -> n*, t -> o*"""
+
+    def __init__(self, words):
+        words = sorted(set(words))
+        labels, first = [], array('I')
+        self.final = bytearray()
+        ranges = deque([(0, len(words), 0)])
+        while ranges:
+            lo, hi, depth = ranges.popleft()
+            first.append(len(labels))
+            final = lo < hi and len(words[lo]) == depth
+            self.final.append(final)
+            lo += final
+            while lo < hi:
+                letter = words[lo][depth]
+                end = lo + 1
+                while end < hi and words[end][depth] == letter:
+                    end += 1
+                labels.append(letter)
+                ranges.append((lo, end, depth + 1))
+                lo = end
+        first.append(len(labels))
+        self.labels = ''.join(labels)
+        self.first = first
+
+    @classmethod
+    def from_arrays(cls, labels, first, final):
+        """a trie from the labels, first and final of another one"""
+        trie = cls.__new__(cls)
+        trie.labels, trie.first, trie.final = labels, first, final
+        return trie
+
+    def __len__(self):
+        return sum(self.final)
+
+    def children(self, node):
+        """(letter, child) pairs of node"""
+        start, end = self.first[node], self.first[node + 1]
+        return zip(self.labels[start:end], range(start + 1, end + 1))
+
+    def lookup(self, word, max_distance=2):
+        """words within max_distance typos of word"""
+        found = set()
+        rows = [[LIMIT] * (len(word) + 2),
+                [LIMIT] + list(range(len(word) + 1))]
+        last_row = {}
+
+        def walk(node, prefix):
+            if self.final[node] and rows[-1][-1] <= max_distance:
+                found.add(prefix)
+            for letter, child in self.children(node):
+                row, best = self._row(word, letter, rows, last_row,
+                                      max_distance)
+                if best > max_distance:
+                    continue
+                seen = last_row.get(letter)
+                last_row[letter] = len(rows) - 1
+                rows.append(row)
+                walk(child, prefix + letter)
+                rows.pop()
+                if seen is None:
+                    del last_row[letter]
+                else:
+                    last_row[letter] = seen
+
+        walk(0, '')
+        return found
+
+    @staticmethod
+    def _row(word, letter, rows, last_row, max_distance):
+        """
+        Next row of the Lowrance-Wagner table, as in
+        index.distance, and its smallest cell. Only
+        cells within max_distance of the diagonal can
+        stay within max_distance, the rest are left at
+        LIMIT.
+
+        """
+        i = len(rows) - 1
+        above = rows[i]
+        row = [LIMIT] * (len(word) + 2)
+        row[1] = best = i
+        start = i - max_distance if i > max_distance else 1
+        stop = i + max_distance if i + max_distance < len(word) else len(word)
+        last_col = word.rfind(letter, 0, start - 1) + 1
+        for j in range(start, stop + 1):
+            char = word[j - 1]
+            if letter == char:
+                cell = above[j]
+                l, last_col = last_col, j
+            else:
+                cell = above[j]
+                if row[j] < cell:
+                    cell = row[j]
+                if above[j + 1] < cell:
+                    cell = above[j + 1]
+                cell += 1
+                l = last_col
+            k = last_row.get(char, 0)
+            if k and l:
+                swap = rows[k][l] + i - k + j - l - 1
+                if swap < cell:
+                    cell = swap
+            row[j + 1] = cell
+            if cell < best:
+                best = cell
+        return row, best
@@ -7,29 +7,85 @@
 # Open source, MIT license
 # http://www.opensource.org/licenses/mit-license.php
 """
-File reader, concat function and dict wrapper
+File readers, concat function, dict and lazy wrappers
 
 Author: Jonas McCallum
 https://github.com/foobarmus/autocorrect
 
 """
-import re, os, tarfile
+import mmap, re, os, tarfile
 from contextlib import closing
 from itertools import chain
 
 PATH = os.path.abspath(os.path.dirname(__file__))
 BZ2 = 'words.tar'
 RE = '[A-Za-z]+'
+CHUNK = 1 << 20
 
-def words_from_archive(filename, include_dups=False, map_case=False):
-    """extract words from a text file in the archive"""
-    bz2 = os.path.join(PATH, BZ2)
+# RE only matches ASCII letters, and no byte of a multi-byte
+# utf-8 character is one, so words are matched on the raw
+# bytes without decoding the text first.
+WORD = re.compile(RE.encode('ascii'))
+TAIL = re.compile(RE.encode('ascii') + rb'\Z')
+
+def iter_words(f, chunk_size=CHUNK):
+    """
+    words of a binary file, read chunk_size bytes at
+    a time; a word cut by the end of a chunk is held
+    back and finished with the next one
+    """
+    tail = b''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        data = tail + chunk
+        end = TAIL.search(data)
+        cut = end.start() if end else len(data)
+        for match in WORD.finditer(data, 0, cut):
+            yield match.group().decode('ascii')
+        tail = data[cut:]
+    if tail:
+        yield tail.decode('ascii')
+
+def map_words(filename, offset=0, size=None):
+    """words of a plain file, or size bytes of it, read through mmap"""
+    with open(filename, 'rb') as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size - offset
+        if size <= 0:
+            return
+        with closing(mmap.mmap(f.fileno(), 0,
+                               access=mmap.ACCESS_READ)) as m:
+            for match in WORD.finditer(m, offset, offset + size):
+                yield match.group().decode('ascii')
+
+def archive_words(filename, archive=None, chunk_size=CHUNK):
+    """
+    Stream the words of a text file in the archive,
+    mapping it in place if the archive is uncompressed
+    and reading it chunk by chunk otherwise.
+
+    """
+    archive = archive or os.path.join(PATH, BZ2)
     tar_path = '{}/{}'.format('words', filename)
-    with closing(tarfile.open(bz2, 'r:tar')) as t:
+    try:
+        with closing(tarfile.open(archive, 'r:')) as t:
+            member = t.getmember(tar_path)
+        if member.isreg() and not member.sparse:
+            yield from map_words(archive, member.offset_data, member.size)
+            return
+    except tarfile.ReadError:
+        pass
+    with closing(tarfile.open(archive, 'r:*')) as t:
         with closing(t.extractfile(tar_path)) as f:
-            words = re.findall(RE, f.read().decode(encoding='utf-8'))
+            yield from iter_words(f, chunk_size)
+
+def words_from_archive(filename, include_dups=False, map_case=False):
+    """extract words from a text file in the archive"""
+    words = archive_words(filename)
     if include_dups:
-        return words
+        return list(words)
     elif map_case:
         return {w.lower():w for w in words}
     else:
@@ -55,3 +111,48 @@ class Zero(dict):
             return 0
 
 zero_default_dict = Zero
+
+class Lazy(object):
+    """stand-in that loads its value on first use"""
+
+    def __init__(self, load):
+        self._load = load
+        self._value = self
+
+    def value(self):
+        """load once, then hand back the same object"""
+        if self._value is self:
+            self._value = self._load()
+        return self._value
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.value(), name)
+
+    def __getitem__(self, key):
+        return self.value()[key]
+
+    def __contains__(self, item):
+        return item in self.value()
+
+    def __iter__(self):
+        return iter(self.value())
+
+    def __len__(self):
+        return len(self.value())
+
+    def __and__(self, other):
+        return self.value() & other
+
+    def __rand__(self, other):
+        return other & self.value()
+
+    def __or__(self, other):
+        return self.value() | other
+
+    def __ror__(self, other):
+        return other | self.value()
+
+    def __repr__(self):
+        return repr(self.value())
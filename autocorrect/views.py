@@ -0,0 +1,204 @@
+# Python 3 Spelling Corrector
+#
+# Copyright 2014 Jonas McCallum.
+# Updated for Python 3, based on Peter Norvig's
+# 2007 version: http://norvig.com/spell-correct.html
+#
+# Open source, MIT license
+# http://www.opensource.org/licenses/mit-license.php
+"""
+Word lists read in place from a mapped snapshot
+
+Every sorted string section of a snapshot has a twin
+.table section, the same words cut or padded to WIDTH
+bytes, so row i of the table is string i. Words up to
+WIDTH - 1 bytes are then found with one searchsorted over
+the mapped table; longer ones fall back to a binary search
+of the strings themselves.
+
+Nothing is copied out of the mapping, so any number of
+processes mapping the same file share a single copy of
+every list (see snapshot.publish()).
+
+"""
+import struct
+from bisect import bisect_left
+
+import numpy as np
+
+from autocorrect.counts import WIDTH
+
+def table(words):
+    """sorted ['ab', 'c'] => the .table section for them"""
+    return np.array([w.encode('utf-8')[:WIDTH] for w in words],
+                    dtype='S{}'.format(WIDTH)).tobytes()
+
+class Strings(object):
+    """string section => read-only sequence of str"""
+
+    def __init__(self, data):
+        count, = struct.unpack_from('<I', data)
+        self.offsets = np.frombuffer(data, dtype='<u4', count=count + 1,
+                                     offset=4)
+        self.blob = data[4 + 4 * (count + 1):]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return str(self.blob[start:end - 1], 'utf-8')
+
+    def __iter__(self):
+        return iter(str(self.blob, 'utf-8').split('\n') if len(self) else [])
+
+
+class SortedStrings(Strings):
+    """sorted string section and its table => read-only set of str"""
+
+    def __init__(self, data, rows):
+        super(SortedStrings, self).__init__(data)
+        self.table = np.frombuffer(rows, dtype='S{}'.format(WIDTH))
+
+    def find(self, words):
+        """['the', 'teh'] => array([i, -1]), i being the row of 'the'"""
+        words = [w.encode('utf-8') for w in words]
+        found = np.full(len(words), -1, dtype=np.int64)
+        # the table's 'S' dtype drops trailing NULs, so 'ab\0' would be 'ab'
+        short = [i for i, w in enumerate(words)
+                 if len(w) < WIDTH and b'\0' not in w]
+        if short and len(self.table):
+            probe = np.array([words[i] for i in short], dtype=self.table.dtype)
+            at = np.searchsorted(self.table, probe)
+            at[at == len(self.table)] = 0
+            hit = self.table[at] == probe
+            found[np.array(short)[hit]] = at[hit]
+        for i, word in enumerate(words):
+            if len(word) >= WIDTH and b'\0' not in word:
+                word = str(word, 'utf-8')
+                at = bisect_left(self, word)
+                if at < len(self) and self[at] == word:
+                    found[i] = at
+        return found
+
+    def __contains__(self, word):
+        return self.find([word])[0] >= 0
+
+    def __and__(self, other):
+        other = list(set(other))
+        return {w for w, i in zip(other, self.find(other)) if i >= 0}
+
+    __rand__ = __and__
+
+    def __or__(self, other):
+        return set(self) | set(other)
+
+    __ror__ = __or__
+
+
+class SortedMapping(object):
+    """SortedStrings keys and Strings values => read-only dict"""
+
+    def __init__(self, keys, values):
+        self._keys = keys
+        self._values = values
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __getitem__(self, key):
+        i = self._keys.find([key])[0]
+        if i < 0:
+            raise KeyError(key)
+        return self._values[i]
+
+    def get(self, key, default=None):
+        i = self._keys.find([key])[0]
+        return self._values[i] if i >= 0 else default
+
+    def keys(self):
+        return self._keys
+
+    def values(self):
+        return self._values
+
+    def items(self):
+        return zip(self._keys, self._values)
+
+
+class SortedCounts(object):
+    """as counts.Counts, over SortedStrings and mapped uint32 counts"""
+
+    def __init__(self, words, counts):
+        self.words = words
+        self.counts = counts
+        self.total = int(counts.sum(dtype=np.uint64))
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return bool(self.lookup([word])[0])
+
+    def __getitem__(self, word):
+        return self.get(word)
+
+    def get(self, word):
+        return int(self.lookup([word])[0])
+
+    def lookup(self, words):
+        """['the', 'teh'] => array([80030, 0])"""
+        at = self.words.find(words)
+        found = np.zeros(len(at), dtype=np.uint32)
+        found[at >= 0] = self.counts[at[at >= 0]]
+        return found
+
+    def best(self, words):
+        """most common of words, the first one on a tie"""
+        words = list(words)
+        return words[int(np.argmax(self.lookup(words)))]
+
+
+class SortedPostings(object):
+    """
+    SortedStrings keys, offsets into postings and postings
+    of rows of words => read-only {key: [word, ...]}
+
+    """
+
+    def __init__(self, keys, offsets, postings, words):
+        self._keys = keys
+        self._offsets = offsets
+        self._postings = postings
+        self._words = words
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def get(self, key, default=None):
+        i = self._keys.find([key])[0]
+        if i < 0:
+            return default
+        rows = self._postings[self._offsets[i]:self._offsets[i + 1]]
+        return [self._words[row] for row in rows.tolist()]
+
+    def union(self, keys):
+        """words filed under any of keys, with one search for all of them"""
+        at = self._keys.find(list(keys))
+        runs = [self._postings[self._offsets[i]:self._offsets[i + 1]]
+                for i in at[at >= 0].tolist()]
+        if not runs:
+            return set()
+        return {self._words[row] for row in np.unique(np.concatenate(runs)).tolist()}
@@ -13,13 +13,20 @@ Author: Jonas McCallum
 https://github.com/foobarmus/autocorrect
 
 """
-from autocorrect.utils import concat
+import time
+from collections import namedtuple
+
+from autocorrect.utils import Lazy, concat
 from autocorrect.nlp_parser import NLP_WORDS
+from autocorrect.snapshot import SNAPSHOT
 from autocorrect.word_lists import LOWERCASE, MIXED_CASE
-from autocorrect.word_lists import LOWERED, CASE_MAPPED
+from autocorrect.word_lists import LOWERED, CASE_RESTORED
 
 ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
-KNOWN_WORDS = LOWERCASE | LOWERED | NLP_WORDS
+KNOWN_WORDS = Lazy(lambda: SNAPSHOT.set('KNOWN_WORDS') if SNAPSHOT else
+                   LOWERCASE | LOWERED | NLP_WORDS)
+
+Search = namedtuple('Search', 'words complete')
 
 class Word(object):
     """container for word-based methods"""
@@ -71,11 +78,50 @@ class Word(object):
         return {e2 for e1 in self.typos()
                 for e2 in Word(e1).typos()}
 
+    def iter_typos(self):
+        """typos() one at a time, repeats and all"""
+        for a, b in self.slices:
+            if b:
+                yield concat(a, b[1:])
+                if len(b) > 1:
+                    yield concat(a, b[1], b[0], b[2:])
+                for c in ALPHABET:
+                    yield concat(a, c, b[1:])
+            for c in ALPHABET:
+                yield concat(a, c, b)
+
+    def iter_double_typos(self):
+        """double_typos() one at a time, repeats and all"""
+        for e1 in self.typos():
+            yield from Word(e1).iter_typos()
+
 
 def common(words):
     """{'the', 'teh'} => {'the'}"""
     return set(words) & NLP_WORDS
 
+def search(word, words=None, max_candidates=None, timeout=None):
+    """
+    common(Word(word).double_typos()), checking each
+    double typo as it is made instead of building the
+    set, and giving up after max_candidates of them or
+    timeout seconds.
+
+    'speling' => Search(words={'spelling', ...}, complete=True)
+
+    """
+    words = NLP_WORDS.value() if words is None else words
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    hits = set()
+    for n, edit in enumerate(Word(word).iter_double_typos()):
+        if n == max_candidates or (deadline is not None and
+                                   not n % 256 and
+                                   time.perf_counter() > deadline):
+            return Search(hits, False)
+        if edit in words:
+            hits.add(edit)
+    return Search(hits, True)
+
 def exact(words):
     """{'Snog', 'snog', 'Snoddy'} => {'Snoddy'}"""
     return set(words) & MIXED_CASE
@@ -88,7 +134,7 @@ def known_as_lower(words):
     """{'Natasha', 'Bob'} => {'bob'}"""
     return {w.lower() for w in words} & LOWERCASE
 
-def get_case(word, correction):
+def get_case(word, correction, restored=CASE_RESTORED):
     """
     Best guess of intended case.
 
@@ -107,9 +153,10 @@ def get_case(word, correction):
         return word
     if len(word) > 2 and word[:2].isupper():
         return correction.title()
-    if not known_as_lower([correction]): #expensive
-        try:
-            return CASE_MAPPED[correction]
-        except KeyError:
-            pass
-    return correction
+    return restored.get(correction, correction)
+
+def get_cases(words, corrections):
+    """get_case() over a whole token list"""
+    restored = CASE_RESTORED.value()
+    return [get_case(word, correction, restored)
+            for word, correction in zip(words, corrections)]
@@ -13,7 +13,12 @@ Author: Jonas McCallum
 https://github.com/foobarmus/autocorrect
 
 """
-from autocorrect.utils import words_from_archive
+from autocorrect.snapshot import SNAPSHOT
+from autocorrect.utils import Lazy, words_from_archive
+
+# Each list is read on first use, from the compiled
+# snapshot when there is one (see snapshot.py) and
+# from words.tar otherwise.
 
 # en_US_GB_CA is a superset of US, GB and CA
 # spellings (color, colour, etc). It contains
@@ -28,11 +33,13 @@ from autocorrect.utils import words_from_archive
 # via (lower)
 # Colombo (mixed)
 
-LOWERCASE = words_from_archive('en_US_GB_CA_lower.txt')
+LOWERCASE = Lazy(lambda: SNAPSHOT.set('LOWERCASE') if SNAPSHOT else
+                 words_from_archive('en_US_GB_CA_lower.txt'))
 # {'we', 'flew', 'to', 'via'}
 
-CASE_MAPPED = words_from_archive('en_US_GB_CA_mixed.txt',
-                                 map_case=True)
+CASE_MAPPED = Lazy(lambda: SNAPSHOT.mapping('CASE_MAPPED') if SNAPSHOT else
+                   words_from_archive('en_US_GB_CA_mixed.txt',
+                                      map_case=True))
 #  {abu': 'Abu',
 #  'dhabi': 'Dhabi',
 #  'colombo': 'Colombo'}
@@ -44,8 +51,20 @@ CASE_MAPPED = words_from_archive('en_US_GB_CA_mixed.txt',
 # {'to': 'TO',
 #  'via': 'Via'}
 
-MIXED_CASE = set(CASE_MAPPED.values())
+MIXED_CASE = Lazy(lambda: SNAPSHOT.set('MIXED_CASE') if SNAPSHOT else
+                  set(CASE_MAPPED.values()))
 # {'Abu', 'Dhabi', 'Colombo'}
 
-LOWERED = set(CASE_MAPPED.keys())
+LOWERED = Lazy(lambda: SNAPSHOT.set('LOWERED') if SNAPSHOT else
+               set(CASE_MAPPED.keys()))
 # {'abu', 'dhabi', 'colombo'}
+
+CASE_RESTORED = Lazy(lambda: SNAPSHOT.mapping('CASE_RESTORED') if SNAPSHOT
+                     else {k: v for k, v in CASE_MAPPED.items()
+                           if k not in LOWERCASE})
+# CASE_MAPPED without the words that are also
+# in LOWERCASE, i.e. what get_case() restores:
+#
+# {'abu': 'Abu',
+#  'dhabi': 'Dhabi',
+#  'colombo': 'Colombo'}
@@ -0,0 +1,166 @@
+"""
+    Benchmarks the autocorrect engine offline.
+    Tokens are drawn from the dictionary and pushed to edit distance
+    0, 1 and 2 with utils.noise_maker, at several word lengths. Each
+    target is timed per call (throughput, p50/p99 latency) and then
+    run again under tracemalloc for its peak memory.
+    Type `python autocorrect_benchmark.py -h` for help with arguments.
+"""
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils import noise_maker
+from autocorrect import preload, spell, use_backend
+from autocorrect.index import distance
+from autocorrect.nlp_parser import NLP_WORDS
+from autocorrect.word import Word, common, exact, known
+
+
+def make_tokens(length, typos, samples, seed):
+    '''Dictionary words of a given length, noised to exactly `typos` edits'''
+    rng = random.Random(seed)
+    np.random.seed(seed)
+    words = sorted(w for w in NLP_WORDS if w.islower() and len(w) == length)
+    rng.shuffle(words)
+    tokens = []
+    for word in words:
+        if len(tokens) == samples:
+            break
+        if typos == 0:
+            tokens.append(word)
+            continue
+        for _ in range(50):
+            noisy = noise_maker(word, 1 - typos / len(word))
+            if noisy and distance(word, noisy.lower()) == typos:
+                tokens.append(noisy)
+                break
+    return tokens
+
+
+def targets(tokens):
+    '''name => (function, arguments per call)'''
+    typos = [Word(t).typos() for t in tokens]
+    return {
+        'spell': (spell, [(t,) for t in tokens]),
+        'typos': (lambda t: Word(t).typos(), [(t,) for t in tokens]),
+        'double_typos': (lambda t: Word(t).double_typos(),
+                         [(t,) for t in tokens]),
+        'common': (common, [(e,) for e in typos]),
+        'known': (known, [(e,) for e in typos]),
+        'exact': (exact, [(e,) for e in typos]),
+    }
+
+
+def measure(function, calls, max_calls):
+    '''Latency percentiles, throughput and peak traced memory'''
+    calls = calls[:max_calls]
+    latencies = []
+    start = time.perf_counter()
+    for args in calls:
+        t = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    for args in calls:
+        function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    latencies = np.array(latencies) * 1e6
+    return {'calls': len(calls),
+            'throughput': len(calls) / elapsed if elapsed else 0.0,
+            'p50_us': float(np.percentile(latencies, 50)) if len(calls) else 0.0,
+            'p99_us': float(np.percentile(latencies, 99)) if len(calls) else 0.0,
+            'peak_kb': peak / 1024}
+
+
+def compare(results, baseline_file):
+    '''Print the p50 ratio of each row against a saved run'''
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    key = lambda r: (r['target'], r['length'], r['typos'])
+    before = {key(r): r for r in baseline['results']}
+    print('target        len typos   p50 now/before')
+    for r in results:
+        b = before.get(key(r))
+        if b and b['p50_us']:
+            print('{:13s} {:3d} {:5d} {:9.2f}x'.format(
+                r['target'], r['length'], r['typos'], r['p50_us'] / b['p50_us']))
+
+
+def main(args):
+    use_backend(args.backend)
+    start = time.perf_counter()
+    preload()
+    load_seconds = time.perf_counter() - start
+
+    results = []
+    for length in args.lengths:
+        for typos in (0, 1, 2):
+            tokens = make_tokens(length, typos, args.samples, args.seed)
+            for name, (function, calls) in targets(tokens).items():
+                max_calls = args.double_samples if name == 'double_typos' else len(calls)
+                row = measure(function, calls, max_calls)
+                row.update(target=name, length=length, typos=typos)
+                results.append(row)
+                print('{target:13s} len={length:<3d} typos={typos} '
+                      'calls={calls:<5d} {throughput:10.1f}/s '
+                      'p50={p50_us:10.1f}us p99={p99_us:10.1f}us '
+                      'peak={peak_kb:10.1f}KB'.format(**row))
+
+    report = {'meta': {'seed': args.seed,
+                       'samples': args.samples,
+                       'backend': args.backend,
+                       'load_seconds': load_seconds,
+                       'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print('Saved', args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    named_args = parser.add_argument_group('named arguments')
+
+    named_args.add_argument('-l', '--lengths', metavar='|', nargs='+',
+                            help="""Word lengths to sample""",
+                            required=False, default=[4, 7, 10, 14], type=int)
+
+    named_args.add_argument('-n', '--samples', metavar='|',
+                            help="""Tokens per length and edit distance""",
+                            required=False, default=200, type=int)
+
+    named_args.add_argument('-d', '--double-samples', metavar='|',
+                            help="""Tokens to run double_typos() on, it is slow""",
+                            required=False, default=10, type=int)
+
+    named_args.add_argument('-s', '--seed', metavar='|',
+                            help="""Random seed for sampling and noise""",
+                            required=False, default=1984, type=int)
+
+    named_args.add_argument('-k', '--backend', metavar='|',
+                            help="""Candidate backend: deletes, trie or typos""",
+                            required=False, default='deletes')
+
+    named_args.add_argument('-o', '--output', metavar='|',
+                            help="""Where to save the JSON results""",
+                            required=False, default='autocorrect_benchmark.json')
+
+    named_args.add_argument('-b', '--baseline', metavar='|',
+                            help="""Earlier JSON results to compare against""",
+                            required=False, default=None)
+    args = parser.parse_args()
+    print(args)
+
+    main(args)
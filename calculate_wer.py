@@ -1,80 +1,136 @@
-import numpy as np
-import csv
-
-def calculate_WER_sent(gt, pred):
-    '''
-    calculate_WER('calculating wer between two sentences', 'calculate wer between two sentences')
-    '''
-    gt_words = gt.lower().split(' ')
-    pred_words = pred.lower().split(' ')
-    d = np.zeros(((len(gt_words)+1),(len(pred_words)+1)), dtype=np.uint8)
-    #d = d.reshape((len(gt_words)+1, len(pred_words)+1))
-    
-    #Initializing error matrix
-    for i in range(len(gt_words)+1):
-        for j in range(len(pred_words)+1):
-            if i == 0:
-                d[0][j] = j
-            elif j == 0:
-                d[i][0] = i
-
-    # computation
-    for i in range(1, len(gt_words)+1):
-        for j in range(1, len(pred_words)+1):
-            if gt_words[i-1] == pred_words[j-1]:
-                d[i][j] = d[i-1][j-1]
-            else:
-                substitution = d[i-1][j-1] + 1
-                insertion    = d[i][j-1] + 1
-                deletion     = d[i-1][j] + 1
-                d[i][j] = min(substitution, insertion, deletion)
-    return d[len(gt_words)][len(pred_words)]
-
-
-def calculate_WER(gt, pred):
-    '''
-
-    :param gt: list of sentences of the ground truth
-    :param pred: list of sentences of the predictions
-    both lists must have the same length
-    :return: accumulated WER
-    '''
-    assert len(gt)==len(pred)
-    WER = 0
-    nb_w = 0
-    for i in range(len(gt)):
-        WER += calculate_WER_sent(gt[i], pred[i])
-        nb_w += len(gt[i])
-
-    return  WER/nb_w
-
-tesseract_output = []
-spell_corrected = []
-gt = []
-for row in open('..\data_for_WER.txt'):
-    sents = row.split("\t")
-    tesseract_output.append(sents[0])
-    spell_corrected.append(sents[1])
-    gt.append(sents[2])
-
-
-WER_tesseract = calculate_WER(gt, tesseract_output)
-print('WER_tesseract = ', WER_tesseract)
-
-WER_spell_correction = calculate_WER(gt, spell_corrected)
-print('WER_spell_correction = ', WER_spell_correction)
-
-# Now use another spell checker
-from autocorrect import spell
-for i, sent in  enumerate(spell_corrected):
-    corr_sent = []
-    for word in sent.split(' '):
-        corr_sent.append(spell(word))
-
-    spell_corrected[i] = ' '.join(corr_sent)
-
-WER_tesseract = calculate_WER(gt, tesseract_output)
-print('WER_tesseract = ', WER_tesseract)
-
-WER_spell_correction = calculate_WER(gt, spell_corrected)
-print('WER_spell_correction = ', WER_spell_correction)
\ No newline at end of file
+"""
+    Scores tesseract output and its spell corrected version against the ground truth.
+    Streams (ocr, corrected, gt) triples from a tab separated file, scores chunks of
+    them across a process pool and reports WER and CER with their substitutions,
+    deletions and insertions. Per line results can be written to a file.
+    Type `python calculate_wer.py -h` for help with arguments.
+"""
+import argparse
+import os
+import sys
+from collections import deque
+from multiprocessing import Pool
+
+from wer import NO_ERRORS, char_errors, word_errors
+
+SYSTEMS = ['tesseract', 'spell_correction']
+CHUNK_LINES = 1000
+
+
+def score(rows, use_autocorrect=False, delimiter='\t'):
+    '''rows of ocr, corrected, gt => per line [(word errors, char errors) per system], None for bad rows'''
+    if use_autocorrect:
+        from autocorrect import spell_text
+    scores = []
+    for row in rows:
+        sents = row.rstrip('\r\n').split(delimiter)
+        if len(sents) < 3:
+            scores.append(None)
+            continue
+        tesseract_output, spell_corrected, gt = sents[:3]
+        systems = [tesseract_output, spell_corrected]
+        if use_autocorrect:
+            # Now use another spell checker
+            systems.append(spell_text(spell_corrected))
+        scores.append([(word_errors(gt, pred), char_errors(gt, pred)) for pred in systems])
+    return scores
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def evaluate(rows, processes=1, chunk_lines=CHUNK_LINES, use_autocorrect=False, delimiter='\t'):
+    '''per line scores, in input order, with at most 2 chunks per process in flight'''
+    if processes == 1:
+        for chunk in chunks(rows, chunk_lines):
+            yield from score(chunk, use_autocorrect, delimiter)
+        return
+    if use_autocorrect:
+        # fork once the word lists and index are loaded, so the workers share them
+        from autocorrect.batch import fork_pool, preload
+        preload()
+        pool = fork_pool(processes)
+    else:
+        pool = Pool(processes)
+    with pool:
+        pending = deque()
+        for chunk in chunks(rows, chunk_lines):
+            pending.append(pool.apply_async(score, (chunk, use_autocorrect, delimiter)))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def report(name, words, chars):
+    print('{:18s} WER = {:.4f} (S={} D={} I={} N={})  CER = {:.4f} (S={} D={} I={} N={})'.format(
+        name, words.rate, words.substitutions, words.deletions, words.insertions, words.length,
+        chars.rate, chars.substitutions, chars.deletions, chars.insertions, chars.length))
+
+
+def main(args):
+    systems = SYSTEMS + (['autocorrect'] if args.autocorrect else [])
+    totals = [[NO_ERRORS, NO_ERRORS] for _ in systems]
+    skipped = 0
+    per_line = open(args.per_line, 'w', encoding='utf8') if args.per_line else None
+    if per_line:
+        per_line.write('\t'.join(['line'] + ['{}_{}'.format(s, m) for s in systems
+                                             for m in ('wer', 'cer', 'S', 'D', 'I')]) + '\n')
+    with open(args.data, encoding='utf8') as rows:
+        for n, scores in enumerate(evaluate(rows, args.processes or os.cpu_count(),
+                                            args.chunk_lines, args.autocorrect, args.delimiter)):
+            if scores is None:
+                skipped += 1
+                continue
+            for total, (words, chars) in zip(totals, scores):
+                total[0] += words
+                total[1] += chars
+            if per_line:
+                per_line.write('\t'.join([str(n)] + ['{:.4f}\t{:.4f}\t{}\t{}\t{}'.format(
+                    words.rate, chars.rate, words.substitutions, words.deletions, words.insertions)
+                    for words, chars in scores]) + '\n')
+    if per_line:
+        per_line.close()
+    for name, (words, chars) in zip(systems, totals):
+        report(name, words, chars)
+    if skipped:
+        print('Skipped {} lines without 3 columns'.format(skipped), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    named_args = parser.add_argument_group('named arguments')
+
+    named_args.add_argument('-d', '--data', metavar='|',
+                            help="""Tab separated ocr, spell corrected and ground truth lines""",
+                            required=False, default=os.path.join('..', 'data_for_WER.txt'))
+
+    named_args.add_argument('-o', '--per-line', metavar='|',
+                            help="""File to write per line WER, CER and word operations to""",
+                            required=False, default=None)
+
+    named_args.add_argument('-p', '--processes', metavar='|',
+                            help="""Worker processes, 0 for one per core""",
+                            required=False, default=0, type=int)
+
+    named_args.add_argument('-c', '--chunk-lines', metavar='|',
+                            help="""Lines scored by a worker at a time""",
+                            required=False, default=CHUNK_LINES, type=int)
+
+    named_args.add_argument('-l', '--delimiter', metavar='|',
+                            help="""Column delimiter""",
+                            required=False, default='\t')
+
+    named_args.add_argument('-a', '--autocorrect', action='store_true',
+                            help="""Also score autocorrect run over the spell corrected column""")
+    args = parser.parse_args()
+
+    main(args)
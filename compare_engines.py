@@ -0,0 +1,233 @@
+"""
+    Compares correction engines on the same data, for quality and cost.
+    Every engine corrects every OCR line of a data_for_WER.txt style file in a forked
+    process of its own, and is scored on WER and CER against the ground truth next to
+    lines/sec, tokens/sec, p50/p95/p99 latency per line and how far the peak RSS of its
+    process grew over what it was forked with, so the caller's own memory isn't counted.
+    The results are printed as a RESULTS.md style table and saved as JSON.
+
+    Built in engines: tesseract (the OCR line as is), autocorrect, autocorrect_ocr
+    (autocorrect with an OCR confusion table, see --confusions) and seq2seq
+    (utils.decode_sequence over the models and vocab saved by the training notebooks,
+    see --model-dir and --vocab). Notebook correctors are registered and compared from the notebook:
+
+        from compare_engines import register, compare
+        register('viterbi', spell_viterbi)
+        register('noisy_channel', lambda line: spell_noisy_channel(line, p_uni, p_bi))
+        compare(['autocorrect', 'viterbi', 'noisy_channel'], '../data_for_WER.txt')
+
+    Type `python compare_engines.py -h` for help with arguments.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+from wer import ErrorRate
+
+ENGINES = {}
+
+
+def register(name, correct=None, setup=None):
+    '''
+    Register an engine: correct(line) => corrected line, or setup(args) => such a function,
+    called in the engine's own process so that loading it counts towards its memory.
+    '''
+    ENGINES[name] = setup if setup is not None else (lambda args: correct)
+
+
+def _tesseract(args):
+    return lambda line: line
+
+
+def _autocorrect(args):
+    from autocorrect import preload, spell_text
+    preload()
+    return spell_text
+
+
+def _autocorrect_ocr(args):
+    import autocorrect
+    from autocorrect.confusions import DEFAULT, Confusions
+    autocorrect.use_confusions(Confusions.from_json(args.confusions) if args.confusions else DEFAULT)
+    autocorrect.preload()
+    return autocorrect.spell_text
+
+
+def _seq2seq(args):
+    from keras.models import load_model
+    from utils import check_vocab, decode_sequence, load_vocab
+    encoder_model = load_model(os.path.join(args.model_dir, 'encoder_model-{}.hdf5'.format(args.max_sent_len)))
+    decoder_model = load_model(os.path.join(args.model_dir, 'decoder_model-{}.hdf5'.format(args.max_sent_len)))
+    if args.vocab:
+        vocab_to_int, int_to_vocab = load_vocab(args.vocab, decoder_model)
+    else:
+        vocab = np.load(os.path.join(args.model_dir, 'vocab-{}.npz'.format(args.max_sent_len)), allow_pickle=True)
+        vocab_to_int = vocab['vocab_to_int'].item()
+        int_to_vocab = vocab['int_to_vocab'].item()
+        check_vocab(decoder_model, vocab_to_int)
+    check_vocab(encoder_model, vocab_to_int)
+    max_encoder_seq_length = args.max_sent_len
+
+    def correct(line):
+        input_seq = np.zeros((1, max_encoder_seq_length), dtype='float32')
+        for t, char in enumerate(line[:max_encoder_seq_length]):
+            input_seq[0, t] = vocab_to_int.get(char, vocab_to_int['UNK'])
+        decoded_sentence, _ = decode_sequence(input_seq, encoder_model, decoder_model, len(vocab_to_int),
+                                              max_encoder_seq_length, int_to_vocab, vocab_to_int)
+        return decoded_sentence
+
+    return correct
+
+
+register('tesseract', setup=_tesseract)
+register('autocorrect', setup=_autocorrect)
+register('autocorrect_ocr', setup=_autocorrect_ocr)
+register('seq2seq', setup=_seq2seq)
+
+
+def load_data(file_name, delimiter='\t', prediction_index=0, gt_index=2, num_samples=None):
+    '''(ocr, gt) pairs of a tab separated file'''
+    pairs = []
+    for row in open(file_name, encoding='utf8'):
+        if len(pairs) == num_samples:
+            break
+        sents = row.rstrip('\r\n').split(delimiter)
+        if len(sents) > max(prediction_index, gt_index):
+            pairs.append((sents[prediction_index], sents[gt_index]))
+    return pairs
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+
+def run(name, pairs, args):
+    '''correct and score every line with one engine, in this process'''
+    start_rss = peak_rss_mb()
+    start = time.perf_counter()
+    correct = ENGINES[name](args)
+    setup_seconds = time.perf_counter() - start
+    error_rate = ErrorRate()
+    latencies = []
+    tokens = 0
+    start = time.perf_counter()
+    for ocr, gt in pairs:
+        t = time.perf_counter()
+        corrected = correct(ocr)
+        latencies.append(time.perf_counter() - t)
+        error_rate.update(gt, corrected)
+        tokens += len(ocr.split())
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies or [0.0]) * 1e3
+    return {'engine': name,
+            'wer': error_rate.wer,
+            'cer': error_rate.cer,
+            'lines': len(pairs),
+            'lines_per_sec': len(pairs) / elapsed if elapsed else 0.0,
+            'tokens_per_sec': tokens / elapsed if elapsed else 0.0,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            # over the pages forked from the caller
+            'peak_rss_mb': peak_rss_mb() - start_rss,
+            'setup_seconds': setup_seconds,
+            'word_errors': error_rate.words._asdict(),
+            'char_errors': error_rate.chars._asdict()}
+
+
+def _run(name, pairs, args, queue):
+    try:
+        queue.put(run(name, pairs, args))
+    except Exception as e:
+        queue.put({'engine': name, 'error': repr(e)})
+
+
+def compare(names, data, output=None, args=None, **kwargs):
+    '''run each engine in a process of its own and collect the results'''
+    args = args or argparse.Namespace(confusions=None, model_dir='.', max_sent_len=50, vocab=None)
+    pairs = load_data(data, **kwargs)
+    context = get_context('fork')
+    results = []
+    for name in names:
+        queue = context.Queue()
+        process = context.Process(target=_run, args=(name, pairs, args, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+    print(table(results))
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'data': data, 'lines': len(pairs), 'python': platform.python_version(),
+                       'machine': platform.machine(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'results': results}, f, indent=1)
+    return results
+
+
+def table(results):
+    lines = ['|Engine|WER|CER|Lines/sec|Tokens/sec|p50 (ms)|p95 (ms)|p99 (ms)|Peak RSS growth (MB)|',
+             '---------------|-----------|----------------|----------------|----------------|'
+             '----------------|----------------|----------------|----------------|']
+    for r in results:
+        if 'error' in r:
+            lines.append(' | {} | {} | | | | | | | | '.format(r['engine'], r['error']))
+            continue
+        lines.append(' | {engine} | {wer:.4f} | {cer:.4f} | {lines_per_sec:.1f} | {tokens_per_sec:.1f} | '
+                     '{p50_ms:.2f} | {p95_ms:.2f} | {p99_ms:.2f} | {peak_rss_mb:.0f} | '.format(**r))
+    return '\n'.join(lines)
+
+
+def main(args):
+    compare(args.engines, args.data, args.output, args, gt_index=args.gt_index, num_samples=args.num_samples)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    named_args = parser.add_argument_group('named arguments')
+
+    named_args.add_argument('-e', '--engines', metavar='|', nargs='+',
+                            help="""Engines to compare, of: {}""".format(', '.join(ENGINES)),
+                            required=False, default=['tesseract', 'autocorrect', 'autocorrect_ocr'])
+
+    named_args.add_argument('-d', '--data', metavar='|',
+                            help="""Tab separated ocr, (corrected,) ground truth lines""",
+                            required=False, default=os.path.join('..', 'data_for_WER.txt'))
+
+    named_args.add_argument('-g', '--gt-index', metavar='|',
+                            help="""Column of the ground truth""",
+                            required=False, default=2, type=int)
+
+    named_args.add_argument('-n', '--num-samples', metavar='|',
+                            help="""Lines to use, all by default""",
+                            required=False, default=None, type=int)
+
+    named_args.add_argument('-o', '--output', metavar='|',
+                            help="""Where to save the JSON results""",
+                            required=False, default='compare_engines.json')
+
+    named_args.add_argument('-c', '--confusions', metavar='|',
+                            help="""OCR confusion table for autocorrect_ocr, saved by Confusions.to_json""",
+                            required=False, default=None)
+
+    named_args.add_argument('-m', '--model-dir', metavar='|',
+                            help="""Directory with the seq2seq encoder/decoder models and vocab""",
+                            required=False, default='.')
+
+    named_args.add_argument('-l', '--max-sent-len', metavar='|',
+                            help="""max_sent_len the seq2seq files are named after""",
+                            required=False, default=50, type=int)
+
+    named_args.add_argument('-v', '--vocab', metavar='|',
+                            help="""Vocab saved by utils.save_vocab, instead of the vocab-N.npz of --model-dir""",
+                            required=False, default=None)
+    args = parser.parse_args()
+
+    main(args)
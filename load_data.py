@@ -1,17 +1,155 @@
+"""
+    Collects the (ocr, gt) pairs of a dataset tree into shuffled training shards.
+    The .txt files under the dataset directory are scanned by a pool of processes, which
+    keep the lines of exactly two tab separated columns whose lengths are within the limits.
+    Pairs are deduplicated by hash, the first in file path order kept, shuffled with a seed
+    and written to shards of at most --shard-mb each, next to a JSON manifest of the shards,
+    their line counts and what was dropped and why.
+    Type `python load_data.py -h` for help with arguments.
+"""
+import argparse
+import hashlib
+import json
 import os
-f_out = open('../dat/all_ocr_data.txt', 'w')
-dir = "../dat/DATASETS/"
-for dirpath, dirnames, filenames in os.walk(dir):
-    for file in filenames:
-        if file.endswith(".txt"):
-            print(file)
-            f = open(os.path.join(dirpath, file))
-            '''
-            txt = f.read()
-            f_out.write(txt)
-            '''
-            for row in f:
-                sents = row.split("\t")
-                if len(sents) == 2:
-                    f_out.write(row)
-            f.close()
+import random
+from collections import Counter
+from multiprocessing import Pool
+
+
+def find_files(root, suffix='.txt'):
+    '''Paths of the files under root ending with suffix, sorted'''
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for file in filenames:
+            if file.endswith(suffix):
+                found.append(os.path.join(dirpath, file))
+    return sorted(found)
+
+
+def pair_hash(line):
+    return hashlib.blake2b(line.encode('utf8'), digest_size=8).digest()
+
+
+def scan(job):
+    '''file => its valid, unique pair lines with their hashes, and counts of what was dropped'''
+    file_name, min_len, max_len = job
+    pairs = {}
+    stats = Counter()
+    with open(file_name, 'rb') as f:
+        for row in f:
+            stats['lines'] += 1
+            try:
+                line = row.decode('utf8').rstrip('\r\n')
+            except UnicodeDecodeError:
+                stats['not_utf8'] += 1
+                continue
+            sents = line.split('\t')
+            if len(sents) != 2:
+                stats['not_2_columns'] += 1
+                continue
+            if not all(min_len <= len(sent) and (not max_len or len(sent) <= max_len) for sent in sents):
+                stats['out_of_length'] += 1
+                continue
+            key = pair_hash(line)
+            if key in pairs:
+                stats['duplicates'] += 1
+                continue
+            pairs[key] = line
+    return file_name, pairs, stats
+
+
+def write_shards(lines, output_dir, prefix, shard_bytes):
+    '''lines => files of at most shard_bytes each, and their names, lines and bytes'''
+    shards = []
+    f = None
+    for line in lines:
+        row = (line + '\n').encode('utf8')
+        if f is None or (size + len(row) > shard_bytes and count):
+            if f is not None:
+                f.close()
+                shards.append({'file': name, 'lines': count, 'bytes': size})
+            name = '{}-{:05d}.txt'.format(prefix, len(shards))
+            f = open(os.path.join(output_dir, name), 'wb')
+            size = count = 0
+        f.write(row)
+        size += len(row)
+        count += 1
+    if f is not None:
+        f.close()
+        shards.append({'file': name, 'lines': count, 'bytes': size})
+    return shards
+
+
+def main(args):
+    files = find_files(args.data_dir)
+    seen = set()
+    lines = []
+    stats = Counter()
+    jobs = [(file_name, args.min_len, args.max_len) for file_name in files]
+    with Pool(args.processes or os.cpu_count()) as pool:
+        # in order, so which of the duplicates is kept doesn't depend on the workers
+        for file_name, pairs, file_stats in pool.imap(scan, jobs, chunksize=8):
+            stats.update(file_stats)
+            for key, line in pairs.items():
+                if key in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(key)
+                lines.append(line)
+            if args.verbose:
+                print(file_name, len(pairs))
+    random.Random(args.seed).shuffle(lines)
+    lines_read = stats.pop('lines', 0)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    shards = write_shards(lines, args.output_dir, args.prefix, args.shard_mb * 2 ** 20)
+    manifest = {'data_dir': args.data_dir, 'files': len(files), 'seed': args.seed,
+                'min_len': args.min_len, 'max_len': args.max_len,
+                'lines_read': lines_read, 'lines': len(lines), 'dropped': dict(stats), 'shards': shards}
+    with open(os.path.join(args.output_dir, args.prefix + '.manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    print('{} files, {} lines read, {} pairs written to {} shards, dropped: {}'.format(
+        len(files), lines_read, len(lines), len(shards), dict(stats)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    named_args = parser.add_argument_group('named arguments')
+
+    named_args.add_argument('-d', '--data-dir', metavar='|',
+                            help="""Dataset tree of tab separated ocr, gt .txt files""",
+                            required=False, default=os.path.join('..', 'dat', 'DATASETS'))
+
+    named_args.add_argument('-o', '--output-dir', metavar='|',
+                            help="""Where to write the shards and the manifest""",
+                            required=False, default=os.path.join('..', 'dat'))
+
+    named_args.add_argument('-x', '--prefix', metavar='|',
+                            help="""Name of the shards, <prefix>-00000.txt..., and of <prefix>.manifest.json""",
+                            required=False, default='all_ocr_data')
+
+    named_args.add_argument('-s', '--shard-mb', metavar='|',
+                            help="""Largest size of a shard, in MB""",
+                            required=False, default=256, type=int)
+
+    named_args.add_argument('-m', '--min-len', metavar='|',
+                            help="""Shortest ocr and gt to keep, in chars""",
+                            required=False, default=1, type=int)
+
+    named_args.add_argument('-l', '--max-len', metavar='|',
+                            help="""Longest ocr and gt to keep, in chars, 0 for no limit""",
+                            required=False, default=0, type=int)
+
+    named_args.add_argument('-r', '--seed', metavar='|',
+                            help="""Seed of the shuffle""",
+                            required=False, default=42, type=int)
+
+    named_args.add_argument('-p', '--processes', metavar='|',
+                            help="""Worker processes, 0 for one per core""",
+                            required=False, default=0, type=int)
+
+    named_args.add_argument('-v', '--verbose', action='store_true',
+                            help="""Print every file with its pairs""")
+    args = parser.parse_args()
+
+    main(args)
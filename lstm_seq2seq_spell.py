@@ -58,61 +58,14 @@ from keras.callbacks import ModelCheckpoint, TensorBoard
 import numpy as np
 import os
 from sklearn.model_selection import train_test_split
+from wer import calculate_WER_sent, calculate_WER
+from utils import save_vocab
 
 
 config = tf.ConfigProto()
 config.gpu_options.allow_growth = True
 set_session(tf.Session(config=config))
 
-def calculate_WER_sent(gt, pred):
-    '''
-    calculate_WER('calculating wer between two sentences', 'calculate wer between two sentences')
-    '''
-    gt_words = gt.lower().split(' ')
-    pred_words = pred.lower().split(' ')
-    d = np.zeros(((len(gt_words) + 1), (len(pred_words) + 1)), dtype=np.uint8)
-    # d = d.reshape((len(gt_words)+1, len(pred_words)+1))
-
-    # Initializing error matrix
-    for i in range(len(gt_words) + 1):
-        for j in range(len(pred_words) + 1):
-            if i == 0:
-                d[0][j] = j
-            elif j == 0:
-                d[i][0] = i
-
-    # computation
-    for i in range(1, len(gt_words) + 1):
-        for j in range(1, len(pred_words) + 1):
-            if gt_words[i - 1] == pred_words[j - 1]:
-                d[i][j] = d[i - 1][j - 1]
-            else:
-                substitution = d[i - 1][j - 1] + 1
-                insertion = d[i][j - 1] + 1
-                deletion = d[i - 1][j] + 1
-                d[i][j] = min(substitution, insertion, deletion)
-    return d[len(gt_words)][len(pred_words)]
-
-
-def calculate_WER(gt, pred):
-    '''
-
-    :param gt: list of sentences of the ground truth
-    :param pred: list of sentences of the predictions
-    both lists must have the same length
-    :return: accumulated WER
-    '''
-#    assert len(gt) == len(pred)
-    WER = 0
-    nb_w = 0
-    for i in range(len(gt)):
-        #print(gt[i])
-        #print(pred[i])
-        WER += calculate_WER_sent(gt[i], pred[i])
-        nb_w += len(gt[i])
-
-    return WER / nb_w
-
 # Artificial noisy spelling mistakes
 def noise_maker(sentence, threshold):
     '''Relocate, remove, or add characters to create spelling mistakes'''
@@ -278,28 +231,10 @@ input_token_index = dict(
 target_token_index = dict(
     [(char, i) for i, char in enumerate(target_characters)])
 '''
-# Create a dictionary to convert the vocabulary (characters) to integers
-vocab_to_int = {}
-count = 0
-all_texts = target_texts + input_texts
-for sentence in all_texts:
-    for char in sentence:
-        if char not in vocab_to_int:
-            vocab_to_int[char] = count
-            count += 1
-
-# Add special tokens to vocab_to_int
-codes = ['\t','\n']
-for code in codes:
-	if code not in vocab_to_int:
-		vocab_to_int[code] = count
-		count += 1
-#print(vocab_to_int)
-# Create another dictionary to convert integers to their respective characters
-int_to_vocab = {}
-for character, value in vocab_to_int.items():
-    int_to_vocab[value] = character
-#print(int_to_vocab)
+# Vocab of the training files, saved for the inference, see utils.save_vocab
+vocab_file = os.path.join(data_path, 'vocab.json')
+vocab_to_int, int_to_vocab = save_vocab([tess_correction_data, os.path.join(data_path, 'big_noisy.txt'),
+                                         os.path.join(data_path, 'med_noisy.txt')], vocab_file)
 
 input_characters = sorted(list(vocab_to_int))
 target_characters = sorted(list(vocab_to_int))
@@ -5,14 +5,21 @@ from keras.backend.tensorflow_backend import set_session
 from keras.models import Model
 from keras.layers import Input, LSTM, Dense, Bidirectional, Concatenate, GRU, Dot, TimeDistributed, Activation, Embedding
 from keras import optimizers
-from keras.callbacks import ModelCheckpoint, TensorBoard, LearningRateScheduler
+from keras.callbacks import Callback, ModelCheckpoint, TensorBoard, LearningRateScheduler
+from keras.utils import Sequence
 import numpy as np
 import os
+import mmap
+import shutil
+import hashlib
+from collections import Counter
+from multiprocessing import Pool
 from sklearn.model_selection import train_test_split
 import matplotlib.pyplot as plt
 import seaborn as sns
 import json
 from nltk.tokenize import word_tokenize
+from wer import calculate_WER_sent, calculate_WER, ErrorRate
 
 
 # Utility functions
@@ -24,54 +31,6 @@ def gpu_alloc(device_id):
     set_session(tf.Session(config=config))
 
 
-def calculate_WER_sent(gt, pred):
-    '''
-    calculate_WER('calculating wer between two sentences', 'calculate wer between two sentences')
-    '''
-    gt_words = gt.lower().split(' ')
-    pred_words = pred.lower().split(' ')
-    d = np.zeros(((len(gt_words) + 1), (len(pred_words) + 1)), dtype=np.uint8)
-    # d = d.reshape((len(gt_words)+1, len(pred_words)+1))
-
-    # Initializing error matrix
-    for i in range(len(gt_words) + 1):
-        for j in range(len(pred_words) + 1):
-            if i == 0:
-                d[0][j] = j
-            elif j == 0:
-                d[i][0] = i
-
-    # computation
-    for i in range(1, len(gt_words) + 1):
-        for j in range(1, len(pred_words) + 1):
-            if gt_words[i - 1] == pred_words[j - 1]:
-                d[i][j] = d[i - 1][j - 1]
-            else:
-                substitution = d[i - 1][j - 1] + 1
-                insertion = d[i][j - 1] + 1
-                deletion = d[i - 1][j] + 1
-                d[i][j] = min(substitution, insertion, deletion)
-    return d[len(gt_words)][len(pred_words)]
-
-def calculate_WER(gt, pred):
-    '''
-
-    :param gt: list of sentences of the ground truth
-    :param pred: list of sentences of the predictions
-    both lists must have the same length
-    :return: accumulated WER
-    '''
-#    assert len(gt) == len(pred)
-    WER = 0
-    nb_w = 0
-    for i in range(len(gt)):
-        #print(gt[i])
-        #print(pred[i])
-        WER += calculate_WER_sent(gt[i], pred[i])
-        nb_w += len(gt[i])
-
-    return WER / nb_w
-
 # Artificial noisy spelling mistakes
 def noise_maker(sentence, threshold):
     '''Relocate, remove, or add characters to create spelling mistakes'''
@@ -108,6 +67,94 @@ def noise_maker(sentence, threshold):
 
     return ''.join(noisy_sentence)
 
+NOISE_BATCH = 10000
+
+def batch_noise_maker(sentences, threshold, rng=None, confusions=None):
+    '''
+    noise_maker over a batch of sentences, all random draws made for the whole batch at once
+    Swaps, inserts and deletes have noise_maker's probabilities. rng is a numpy Generator or a seed,
+    the same seed gives the same noise. confusions, like autocorrect.confusions.OCR, is
+    {(observed, intended): p} for OCR-like mistakes, e.g. ('rn', 'm'): 0.05 types 'm' as 'rn' 5% of the time;
+    only single character intended strings are used.
+    '''
+    if not isinstance(rng, np.random.Generator):
+        rng = np.random.default_rng(rng)
+    sentences = list(sentences)
+    lengths = np.array([len(s) for s in sentences], dtype=np.int64)
+    ends = np.cumsum(lengths)
+    n = int(ends[-1]) if len(sentences) else 0
+    if not n:
+        return ['' for _ in sentences]
+    codes = np.frombuffer(''.join(sentences).encode('utf-32-le'), dtype=np.uint32)
+    # Same two draws per character as noise_maker: one for correct or not, one for the kind of mistake
+    error = rng.random(n) >= threshold
+    kind = rng.random(n)
+    # The last character of a sentence can't swap, noise_maker draws again for it
+    last = ends[lengths > 0] - 1
+    redo = last[error[last] & (kind[last] > 0.67)]
+    while len(redo):
+        error[redo] = rng.random(len(redo)) >= threshold
+        kind[redo] = rng.random(len(redo))
+        redo = redo[error[redo] & (kind[redo] > 0.67)]
+    swap = error & (kind > 0.67)
+    insert = error & (kind < 0.33)
+    # A swap takes the next character along, so in a run of swaps only every other one happens
+    index = np.arange(n)
+    run_start = np.maximum.accumulate(np.where(swap, 0, index + 1))
+    swap &= (index - run_start) % 2 == 0
+    swapped = np.zeros(n, dtype=bool)
+    swapped[1:] = swap[:-1]
+    keep = ~error & ~swapped
+    insert &= ~swapped
+
+    # Each character is typed as up to 2 characters, 0 being none
+    first, second = codes.copy(), np.zeros(n, dtype=np.uint32)
+    if confusions:
+        table = {}
+        for (observed, intended), p in confusions.items():
+            if len(intended) == 1 and len(observed) <= 2:
+                table.setdefault(intended, []).append((observed, p))
+        draw = rng.random(n)
+        for intended, options in table.items():
+            at = np.flatnonzero(codes == ord(intended))
+            if not len(at):
+                continue
+            bound = np.zeros(len(at))
+            for observed, p in options:
+                hit = at[(draw[at] >= bound) & (draw[at] < bound + p)]
+                observed = [ord(c) for c in observed] + [0, 0]
+                first[hit], second[hit] = observed[0], observed[1]
+                bound += p
+    letters = rng.integers(ord('a'), ord('z') + 1, n, dtype=np.uint32)
+
+    next_first, next_second = np.zeros(n, dtype=np.uint32), np.zeros(n, dtype=np.uint32)
+    next_first[:-1], next_second[:-1] = first[1:], second[1:]
+    typed = np.zeros((n, 4), dtype=np.uint32)
+    typed[keep, 0], typed[keep, 1] = first[keep], second[keep]
+    typed[insert, 0] = letters[insert]
+    typed[insert, 2], typed[insert, 3] = first[insert], second[insert]
+    typed[swap, 0], typed[swap, 1] = next_first[swap], next_second[swap]
+    typed[swap, 2], typed[swap, 3] = first[swap], second[swap]
+
+    filled = typed != 0
+    sizes = np.concatenate([[0], np.cumsum(filled.sum(axis=1))])
+    text = typed[filled].tobytes().decode('utf-32-le')
+    bounds = sizes[np.concatenate([[0], ends])]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(sentences))]
+
+def with_noise(texts, threshold, rng=None, confusions=None, batch_size=NOISE_BATCH):
+    '''(text, noisy text) for an iterable of texts, made batch_size at a time by batch_noise_maker'''
+    if not isinstance(rng, np.random.Generator):
+        rng = np.random.default_rng(rng)
+    batch = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) == batch_size:
+            yield from zip(batch, batch_noise_maker(batch, threshold, rng, confusions))
+            batch = []
+    if batch:
+        yield from zip(batch, batch_noise_maker(batch, threshold, rng, confusions))
+
 def load_data_with_gt(file_name, num_samples, max_sent_len, min_sent_len, delimiter='\t', gt_index=1, prediction_index=0):
     '''Load data from txt file, with each line has: <TXT><TAB><GT>. The  target to the decoder muxt have \t as the start trigger and \n as the stop trigger.'''
     cnt = 0  
@@ -131,32 +178,31 @@ def load_data_with_gt(file_name, num_samples, max_sent_len, min_sent_len, delimi
                 gt_texts.append(sents[gt_index])
     return input_texts, target_texts, gt_texts
 
-def load_data_with_noise(file_name, num_samples, noise_threshold, max_sent_len, min_sent_len):
+def load_data_with_noise(file_name, num_samples, noise_threshold, max_sent_len, min_sent_len, seed=None, confusions=None):
     '''Load data from txt file, with each line has: <TXT>. The GT is just a noisy version of TXT. The  target to the decoder muxt have \t as the start trigger and \n as the stop trigger.'''
     cnt = 0  
     input_texts = []
     gt_texts = []
     target_texts = []
+    rng = np.random.default_rng(seed)
     while cnt < num_samples :
-        for row in open(file_name, encoding='utf8'):
-        #for row in open(file_name):
+        rows = (row.split("\t") for row in open(file_name, encoding='utf8'))
+        for gt, input_text in with_noise((sents[1] for sents in rows if len(sents) >= 2), noise_threshold, rng, confusions):
             if cnt < num_samples :
-                sents = row.split("\t")
-                if (len(sents) < 2):
-                    continue                
-                input_text = noise_maker(sents[1], noise_threshold)
                 input_text = input_text[:-1]
 
-                target_text = '\t' + sents[1] + '\n'            
+                target_text = '\t' + gt + '\n'            
                 if len(input_text) > min_sent_len and len(input_text) < max_sent_len and len(target_text) > min_sent_len and len(target_text) < max_sent_len:
                     cnt += 1
                     input_texts.append(input_text)
                     target_texts.append(target_text)
                     gt_texts.append(target_text[1:-1])
+            else:
+                break
                     
     return input_texts, target_texts, gt_texts
 
-def load_medical_terms_with_noise(json_file, num_samples, noise_threshold):
+def load_medical_terms_with_noise(json_file, num_samples, noise_threshold, seed=None, confusions=None):
     with open(json_file) as f:
         med_terms_dict = json.load(f)
     med_terms = list(med_terms_dict.keys())
@@ -164,10 +210,10 @@ def load_medical_terms_with_noise(json_file, num_samples, noise_threshold):
     gt_texts = []
     target_texts = []
     cnt = 0
+    rng = np.random.default_rng(seed)
     while cnt < num_samples:
-        for term in med_terms:
+        for term, input_text in with_noise(med_terms[:num_samples - cnt], noise_threshold, rng, confusions):
             if cnt < num_samples :
-                input_text = noise_maker(term, noise_threshold)
                 input_text = input_text[:-1]   
 
                 target_text = '\t' + term + '\n'
@@ -178,7 +224,7 @@ def load_medical_terms_with_noise(json_file, num_samples, noise_threshold):
                 cnt += 1
     return input_texts, target_texts, gt_texts, med_terms_dict
 
-def load_accidents_terms_with_noise(file_name, limit, num_samples, noise_threshold):
+def load_accidents_terms_with_noise(file_name, limit, num_samples, noise_threshold, seed=None, confusions=None):
 
     f = open(file_name, encoding='utf8')
     line = 0    
@@ -195,10 +241,10 @@ def load_accidents_terms_with_noise(file_name, limit, num_samples, noise_thresho
     gt_texts = []
     target_texts = []
     cnt = 0
+    rng = np.random.default_rng(seed)
     while cnt < num_samples:
-        for term in med_terms:
+        for term, input_text in with_noise(med_terms[:num_samples - cnt], noise_threshold, rng, confusions):
             if cnt < num_samples :
-                input_text = noise_maker(term, noise_threshold)
                 input_text = input_text[:-1]   
 
                 target_text = '\t' + term + '\n'
@@ -210,18 +256,17 @@ def load_accidents_terms_with_noise(file_name, limit, num_samples, noise_thresho
                 
     return input_texts, target_texts, gt_texts
 
-def load_procedures_tests_with_noise(file_name, num_samples, noise_threshold):
+def load_procedures_tests_with_noise(file_name, num_samples, noise_threshold, seed=None, confusions=None):
     '''Load data from txt file, with each line has: <TXT>. The GT is just a noisy version of TXT. The  target to the decoder muxt have \t as the start trigger and \n as the stop trigger.'''
     cnt = 0  
     input_texts = []
     gt_texts = []
     target_texts = []
+    rng = np.random.default_rng(seed)
     while cnt < num_samples :
-        for row in open(file_name, encoding='utf8'):
-        #for row in open(file_name):
+        for row, input_text in with_noise(open(file_name, encoding='utf8'), noise_threshold, rng, confusions):
             if cnt < num_samples :
                 
-                input_text = noise_maker(row, noise_threshold)
                 input_text = input_text[:-1]
 
                 target_text = '\t' + row + '\n'            
@@ -230,6 +275,8 @@ def load_procedures_tests_with_noise(file_name, num_samples, noise_threshold):
                 input_texts.append(input_text)
                 target_texts.append(target_text)
                 gt_texts.append(target_text[1:-1])
+            else:
+                break
                     
     return input_texts, target_texts, gt_texts
 
@@ -257,17 +304,93 @@ def build_vocab(all_texts):
         
     return vocab_to_int, int_to_vocab
 
-def vectorize_data(input_texts, target_texts, max_encoder_seq_length, num_encoder_tokens, vocab_to_int):
-    '''Prepares the input text and targets into the proper seq2seq numpy arrays'''
+VOCAB_VERSION = 1
+VOCAB_CODES = ['UNK', ' ', '\t', '\n']
+
+def count_chars(file_name, chunk_size=1 << 20):
+    '''Counter of the chars of a text file, read chunk_size chars at a time'''
+    counts = Counter()
+    with open(file_name, encoding='utf8') as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            counts.update(chunk)
+    return counts
+
+def vocab_hash(vocab_to_int):
+    return hashlib.sha1(json.dumps(vocab_to_int, sort_keys=True).encode('utf8')).hexdigest()
+
+def save_vocab(file_names, vocab_file, processes=1, codes=VOCAB_CODES):
+    '''
+    Build the vocab of text files in one streaming pass, over processes files at a time, and save it to vocab_file
+    as JSON with its version and content hash, for load_vocab at training and inference. Unlike build_vocab the
+    ids don't depend on the order of the texts: codes come first, UNK at 0 to be masked, then chars by code point.
+    '''
+    file_names = list(file_names)
+    if processes > 1:
+        with Pool(processes) as pool:
+            file_counts = pool.map(count_chars, file_names)
+    else:
+        file_counts = map(count_chars, file_names)
+    counts = Counter()
+    for file_count in file_counts:
+        counts.update(file_count)
+    vocab_to_int = {code: i for i, code in enumerate(codes)}
+    for char in sorted(set(counts) - set(codes)):
+        vocab_to_int[char] = len(vocab_to_int)
+    with open(vocab_file, 'w', encoding='utf8') as f:
+        json.dump({'version': VOCAB_VERSION, 'hash': vocab_hash(vocab_to_int), 'sources': list(file_names),
+                   'vocab_to_int': vocab_to_int}, f, ensure_ascii=False, indent=1)
+    return vocab_to_int, {value: character for character, value in vocab_to_int.items()}
+
+def load_vocab(vocab_file, model=None):
+    '''
+    vocab_to_int, int_to_vocab saved by save_vocab. Refuses a file of another version, or whose content doesn't
+    match its hash, and, given a model, a vocab whose size isn't the one of the model's embeddings and output.
+    '''
+    with open(vocab_file, encoding='utf8') as f:
+        saved = json.load(f)
+    if saved.get('version') != VOCAB_VERSION:
+        raise ValueError('{} is vocab version {}, not {}'.format(vocab_file, saved.get('version'), VOCAB_VERSION))
+    vocab_to_int = saved['vocab_to_int']
+    if vocab_hash(vocab_to_int) != saved['hash']:
+        raise ValueError('{} does not match its hash {}'.format(vocab_file, saved['hash']))
+    if model is not None:
+        check_vocab(model, vocab_to_int)
+    return vocab_to_int, {value: character for character, value in vocab_to_int.items()}
+
+def check_vocab(model, vocab_to_int):
+    '''Raise ValueError if the model's Embedding inputs or softmax Dense outputs aren't of the vocab size'''
+    sizes = [layer.input_dim for layer in model.layers if isinstance(layer, Embedding)]
+    sizes += [layer.units for layer in model.layers
+              if isinstance(layer, Dense) and layer.get_config()['activation'] == 'softmax']
+    if any(size != len(vocab_to_int) for size in sizes):
+        raise ValueError('vocab of {} chars does not fit model {} of sizes {}'.format(len(vocab_to_int), model.name,
+                                                                                     sizes))
+
+def target_dtype(num_tokens):
+    '''Smallest integer type for sparse targets of num_tokens classes, and num_tokens for padding'''
+    return 'uint8' if num_tokens < 256 else 'int16'
+
+def vectorize_data(input_texts, target_texts, max_encoder_seq_length, num_encoder_tokens, vocab_to_int, sparse=False):
+    '''
+    Prepares the input text and targets into the proper seq2seq numpy arrays
+    With sparse=True decoder_target_data holds the char ints, (samples, steps, 1) of uint8 or int16, instead of
+    one hot floats, for a model compiled with sparse=True, see build_model. That's vocab size * 4 times smaller.
+    Its padding is num_encoder_tokens, one past the last char, as 0 is UNK, which is a target like any other.
+    '''
     encoder_input_data = np.zeros(
     (len(input_texts), max_encoder_seq_length),
     dtype='float32')
     decoder_input_data = np.zeros(
         (len(input_texts), max_encoder_seq_length),
         dtype='float32')
-    decoder_target_data = np.zeros(
-        (len(input_texts), max_encoder_seq_length, num_encoder_tokens),
-        dtype='float32')
+    if sparse:
+        decoder_target_data = np.full(
+            (len(input_texts), max_encoder_seq_length, 1), num_encoder_tokens,
+            dtype=target_dtype(num_encoder_tokens))
+    else:
+        decoder_target_data = np.zeros(
+            (len(input_texts), max_encoder_seq_length, num_encoder_tokens),
+            dtype='float32')
 
     for i, (input_text, target_text) in enumerate(zip(input_texts, target_texts)):
         for t, char in enumerate(input_text):
@@ -280,10 +403,233 @@ def vectorize_data(input_texts, target_texts, max_encoder_seq_length, num_encode
             if t > 0:
                 # decoder_target_data will be ahead by one timestep
                 # and will not include the start character.
-                decoder_target_data[i, t - 1, vocab_to_int[char]] = 1.
+                if sparse:
+                    decoder_target_data[i, t - 1, 0] = vocab_to_int[char]
+                else:
+                    decoder_target_data[i, t - 1, vocab_to_int[char]] = 1.
                 
     return encoder_input_data, decoder_input_data, decoder_target_data
 
+class UnknownAsUNK(dict):
+    '''vocab_to_int that gives the UNK int for chars it doesn't have, e.g. noise letters missing from clean text'''
+    def __missing__(self, char):
+        return self['UNK']
+
+class NoisySequence(Sequence):
+    '''
+    ([encoder_input_data, decoder_input_data], decoder_target_data) batches made on the fly from clean texts,
+    in place of load_*_with_noise + vectorize_data. source is a list of texts, e.g. the medical terms, or a file
+    read lazily: only the offsets of its lines (or of their `column`-th tab separated field) are kept in memory
+    and each batch reads, noises with batch_noise_maker and vectorizes just its texts. Every epoch is a fresh
+    shuffle and fresh noise, both derived from (seed, epoch, batch), so workers need not share state:
+    model.fit_generator(NoisySequence(...), epochs=epochs, workers=4, use_multiprocessing=True)
+    num_samples per epoch may be more than the texts, which are then repeated with different noise.
+    sparse=True gives integer targets, see vectorize_data.
+    '''
+    def __init__(self, source, vocab_to_int, max_encoder_seq_length, noise_threshold, batch_size=64,
+                 num_samples=None, min_sent_len=0, column=None, delimiter='\t', seed=None, confusions=None,
+                 sparse=False):
+        # noise inserts letters and confusions the vocab may not have
+        self.vocab_to_int = UnknownAsUNK(vocab_to_int)
+        self.max_encoder_seq_length = max_encoder_seq_length
+        self.noise_threshold = noise_threshold
+        self.batch_size = batch_size
+        self.confusions = confusions
+        self.sparse = sparse
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self.epoch = 0
+        self._data = None
+        # target_text is '\t' + text + '\n', and has to fit the decoder
+        fits = lambda text: min_sent_len < len(text) + 2 <= max_encoder_seq_length
+        if isinstance(source, str):
+            self.file_name = source
+            self.texts = None
+            self.spans = self._index(source, fits, column, delimiter)
+        else:
+            self.file_name = None
+            self.texts = [text for text in source if fits(text)]
+        self.num_samples = num_samples or self._count()
+        self.order = self._order()
+
+    @staticmethod
+    def _index(file_name, fits, column, delimiter):
+        '''(start, end) byte offsets of the texts of a file, one pass over it'''
+        spans = []
+        delimiter = delimiter.encode('utf8')
+        offset = 0
+        with open(file_name, 'rb') as f:
+            for line in f:
+                start, text = offset, line.rstrip(b'\r\n')
+                offset += len(line)
+                if column is not None:
+                    fields = text.split(delimiter)
+                    if len(fields) <= column:
+                        continue
+                    start += sum(len(field) for field in fields[:column]) + len(delimiter) * column
+                    text = fields[column]
+                if fits(text.decode('utf8', errors='replace')):
+                    spans.append((start, start + len(text)))
+        return np.array(spans, dtype=np.int64).reshape(-1, 2)
+
+    def __getstate__(self):
+        # the memory map is per process, opened again on first use
+        state = self.__dict__.copy()
+        state['_data'] = None
+        return state
+
+    def _count(self):
+        return len(self.texts) if self.texts is not None else len(self.spans)
+
+    def _order(self):
+        return np.random.default_rng([self.seed, self.epoch]).permutation(self.num_samples) % self._count()
+
+    def _text(self, i):
+        if self.texts is not None:
+            return self.texts[i]
+        if self._data is None:
+            with open(self.file_name, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start, end = self.spans[i]
+        return self._data[start:end].decode('utf8', errors='replace')
+
+    def __len__(self):
+        return int(np.ceil(self.num_samples / self.batch_size))
+
+    def __getitem__(self, index):
+        gt_texts = [self._text(i) for i in self.order[index * self.batch_size:(index + 1) * self.batch_size]]
+        rng = np.random.default_rng([self.seed, self.epoch, index])
+        input_texts = [text[:self.max_encoder_seq_length]
+                       for text in batch_noise_maker(gt_texts, self.noise_threshold, rng, self.confusions)]
+        target_texts = ['\t' + text + '\n' for text in gt_texts]
+        encoder_input_data, decoder_input_data, decoder_target_data = vectorize_data(
+            input_texts, target_texts, self.max_encoder_seq_length, len(self.vocab_to_int), self.vocab_to_int,
+            self.sparse)
+        return [encoder_input_data, decoder_input_data], decoder_target_data
+
+    def on_epoch_end(self):
+        self.epoch += 1
+        self.order = self._order()
+
+BUCKET_WIDTH = 8
+
+class BucketSequence(Sequence):
+    '''
+    ([encoder_input_data, decoder_input_data], decoder_target_data) batches of the texts the load_* functions
+    return, each padded only to its own longest text instead of max_encoder_seq_length. Samples are put in
+    buckets of bucket_width chars by length and batches are made within a bucket, so short field labels are
+    batched together and don't pay for the timesteps of long lines. Each epoch shuffles the samples in every
+    bucket and the order of the batches across buckets. For the models of build_model, or any with Input(shape=(None,)):
+    model.fit_generator(BucketSequence(input_texts, target_texts, vocab_to_int), epochs=epochs)
+    '''
+    def __init__(self, input_texts, target_texts, vocab_to_int, batch_size=64, bucket_width=BUCKET_WIDTH,
+                 seed=None, sparse=False):
+        self.input_texts = input_texts
+        self.target_texts = target_texts
+        self.vocab_to_int = vocab_to_int
+        self.batch_size = batch_size
+        self.sparse = sparse
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self.epoch = 0
+        self.lengths = np.array([max(len(input_text), len(target_text))
+                                 for input_text, target_text in zip(input_texts, target_texts)], dtype=np.int64)
+        bucket_ids = self.lengths // bucket_width
+        self.buckets = [np.flatnonzero(bucket_ids == bucket) for bucket in np.unique(bucket_ids)]
+        self.batches = self._batches()
+
+    def _batches(self):
+        rng = np.random.default_rng([self.seed, self.epoch])
+        batches = []
+        for bucket in self.buckets:
+            bucket = rng.permutation(bucket)
+            batches.extend(bucket[start:start + self.batch_size] for start in range(0, len(bucket), self.batch_size))
+        return [batches[i] for i in rng.permutation(len(batches))]
+
+    def __len__(self):
+        return len(self.batches)
+
+    def __getitem__(self, index):
+        ids = self.batches[index]
+        steps = int(self.lengths[ids].max())
+        encoder_input_data, decoder_input_data, decoder_target_data = vectorize_data(
+            [self.input_texts[i] for i in ids], [self.target_texts[i] for i in ids], steps,
+            len(self.vocab_to_int), self.vocab_to_int, self.sparse)
+        return [encoder_input_data, decoder_input_data], decoder_target_data
+
+    def padding(self):
+        '''fraction of the timesteps of an epoch that are padding, against padding all to the longest text'''
+        steps = sum(len(batch) * self.lengths[batch].max() for batch in self.batches)
+        return 1 - self.lengths.sum() / steps, 1 - self.lengths.sum() / (len(self.lengths) * self.lengths.max())
+
+    def on_epoch_end(self):
+        self.epoch += 1
+        self.batches = self._batches()
+
+CACHE_DIR = 'vectorized_cache'
+VECTORIZED = ['encoder_input_data', 'decoder_input_data', 'decoder_target_data']
+# 2: sparse targets padded with the vocab size rather than 0
+VECTORIZED_VERSION = 2
+
+def file_hash(file_name, chunk_size=1 << 20):
+    '''sha1 of a file's content, read chunk_size bytes at a time'''
+    sha = hashlib.sha1()
+    with open(file_name, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def load_vectorized_data(loader, file_name, max_encoder_seq_length=None, vocab_to_int=None, sparse=False,
+                         cache_dir=CACHE_DIR, **loader_args):
+    '''
+    vectorize_data(loader(file_name, **loader_args)), cached on disk as .npy files keyed by the content of
+    file_name, the loader and its arguments, the vocab and the vectorize arguments. A repeat call reopens
+    the arrays with np.load(mmap_mode='r'), so it takes no time, and processes share them in the page cache.
+    Without vocab_to_int, one is built from the texts with build_vocab and cached with the arrays.
+    Noisy loaders are only cached with a seed, otherwise every call is new noise.
+    load_vectorized_data(load_data_with_noise, 'all_ocr_data.txt', num_samples=1000000, noise_threshold=0.9,
+                         max_sent_len=50, min_sent_len=5, seed=1)
+    => encoder_input_data, decoder_input_data, decoder_target_data, vocab_to_int, int_to_vocab
+    '''
+    key = hashlib.sha1(json.dumps({'file': file_hash(file_name),
+                                   'loader': loader.__name__,
+                                   # repr, as the confusions of noisy loaders have tuple keys
+                                   'loader_args': repr(sorted(loader_args.items())),
+                                   'vocab': vocab_to_int,
+                                   'max_encoder_seq_length': max_encoder_seq_length,
+                                   'sparse': sparse,
+                                   'version': VECTORIZED_VERSION}, sort_keys=True).encode('utf8')).hexdigest()
+    path = os.path.join(cache_dir, key)
+    cache = 'noise_threshold' not in loader_args or loader_args.get('seed') is not None
+    if cache and os.path.exists(path):
+        with open(os.path.join(path, 'vocab.json'), encoding='utf8') as f:
+            vocab_to_int = json.load(f)
+        int_to_vocab = {value: character for character, value in vocab_to_int.items()}
+        return tuple(np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in VECTORIZED) + \
+            (vocab_to_int, int_to_vocab)
+
+    input_texts, target_texts = loader(file_name, **loader_args)[:2]
+    if vocab_to_int is None:
+        vocab_to_int, int_to_vocab = build_vocab(target_texts + input_texts)
+    else:
+        int_to_vocab = {value: character for character, value in vocab_to_int.items()}
+    if max_encoder_seq_length is None:
+        max_encoder_seq_length = max(len(text) for text in input_texts + target_texts)
+    arrays = vectorize_data(input_texts, target_texts, max_encoder_seq_length, len(vocab_to_int), vocab_to_int,
+                            sparse)
+    if cache:
+        # written aside and renamed in place, so a cache entry is complete or missing, even with concurrent runs
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        os.makedirs(tmp_path)
+        for name, array in zip(VECTORIZED, arrays):
+            np.save(os.path.join(tmp_path, name + '.npy'), array)
+        with open(os.path.join(tmp_path, 'vocab.json'), 'w', encoding='utf8') as f:
+            json.dump(vocab_to_int, f)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path)
+    return tuple(arrays) + (vocab_to_int, int_to_vocab)
+
 def decode_gt_sequence(input_seq, int_to_vocab):
 
     stop_condition = False
@@ -360,7 +706,103 @@ def decode_sequence(input_seq, encoder_model, decoder_model, num_decoder_tokens,
     return decoded_sentence, attention_density
 
 
-def build_model(num_encoder_tokens, latent_dim):
+def decode_sequences(input_seqs, encoder_model, decoder_model, max_encoder_seq_length, int_to_vocab, vocab_to_int):
+    '''decode_sequence for a whole batch of input sequences at once, without the attention'''
+    encoder_outputs, h, c = encoder_model.predict(input_seqs)
+    states_value = [h, c]
+    target_seq = np.zeros((len(input_seqs), 1))
+    target_seq[:, 0] = vocab_to_int['\t']
+
+    decoded_sentences = [''] * len(input_seqs)
+    done = np.zeros(len(input_seqs), dtype=bool)
+    special_chars = ['\\', '/', '-', '—' , ':', '[', ']', ',', '.', '"', ';', '%', '~', '(', ')', '{', '}', '$']
+    i = 0
+    while not done.all():
+        output_tokens, _, h, c = decoder_model.predict(
+            [target_seq, encoder_outputs] + states_value)
+        sampled_token_indices = np.argmax(output_tokens[:, -1, :], axis=-1)
+        for n in np.flatnonzero(~done):
+            sampled_char = int_to_vocab[sampled_token_indices[n]]
+            orig_char = int_to_vocab[int(input_seqs[n, i])] if i < input_seqs.shape[1] else ''
+            # Exit condition: either hit max length
+            # or find stop character.
+            if (sampled_char == '\n' or
+               len(decoded_sentences[n]) > max_encoder_seq_length):
+                done[n] = True
+                sampled_char = ''
+
+            # Copy digits as it, since the spelling corrector is not good at digit corrections
+            if(orig_char.isdigit() or orig_char in special_chars):
+                decoded_sentences[n] += orig_char
+            elif not (sampled_char.isdigit() or sampled_char in special_chars):
+                decoded_sentences[n] += sampled_char
+
+        target_seq = sampled_token_indices.reshape(-1, 1).astype('float32')
+        states_value = [h, c]
+
+        i += 1
+        if(i > 48):
+            i = 0
+    return decoded_sentences
+
+
+class WERCallback(Callback):
+    '''
+    Decodes a fixed validation sample every `every` epochs, in batches, and adds
+    val_wer and val_cer to the epoch logs. Put it before TensorBoard(log_dir='./Graph')
+    and EarlyStopping(monitor='val_wer') in the callbacks list, so they see them; on the
+    epochs in between the last values are carried over.
+    '''
+    def __init__(self, input_texts, target_texts, encoder_model, decoder_model, max_encoder_seq_length,
+                 num_encoder_tokens, vocab_to_int, int_to_vocab, every=1, batch_size=256):
+        super(WERCallback, self).__init__()
+        self.encoder_input_data, _, _ = vectorize_data(input_texts, target_texts, max_encoder_seq_length,
+                                                       num_encoder_tokens, vocab_to_int, sparse=True)
+        # drop the '\t' and '\n' markers, as decode_sequence does not produce them
+        self.target_texts = [t.strip('\t\n') for t in target_texts]
+        self.encoder_model = encoder_model
+        self.decoder_model = decoder_model
+        self.max_encoder_seq_length = max_encoder_seq_length
+        self.vocab_to_int = vocab_to_int
+        self.int_to_vocab = int_to_vocab
+        self.every = every
+        self.batch_size = batch_size
+        self.error_rate = ErrorRate()
+        self.last = {}
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs if logs is not None else {}
+        if (epoch + 1) % self.every == 0:
+            self.error_rate.reset()
+            for start in range(0, len(self.target_texts), self.batch_size):
+                decoded_sentences = decode_sequences(self.encoder_input_data[start:start + self.batch_size],
+                                                     self.encoder_model, self.decoder_model,
+                                                     self.max_encoder_seq_length, self.int_to_vocab,
+                                                     self.vocab_to_int)
+                self.error_rate.update_many(self.target_texts[start:start + self.batch_size], decoded_sentences)
+            self.last = {'val_wer': self.error_rate.wer, 'val_cer': self.error_rate.cer}
+            print('Epoch {}: val_wer = {:.4f}, val_cer = {:.4f}'.format(epoch + 1, self.error_rate.wer,
+                                                                         self.error_rate.cer))
+        logs.update(self.last)
+
+
+def masked_sparse_categorical_crossentropy(y_true, y_pred):
+    '''
+    sparse_categorical_crossentropy over int targets padded with the vocab size, see vectorize_data, so UNK
+    targets, 0, still count. Padded steps count 0, as they do with the all zeros one hot targets, so the loss
+    is the same as categorical_crossentropy's
+    '''
+    num_classes = K.cast(K.shape(y_pred)[-1], K.dtype(y_true))
+    mask = K.less(K.max(y_true, axis=-1), num_classes)
+    # padding to class 0, in range for the loss, then masked out
+    y_true = y_true * K.cast(K.expand_dims(mask), K.dtype(y_true))
+    return K.sparse_categorical_crossentropy(y_true, y_pred) * K.cast(mask, K.floatx())
+
+def build_model(num_encoder_tokens, latent_dim, lr=None, sparse=False):
+    '''
+    Bi LSTM encoder, LSTM decoder with dot attention. Given lr, the training model is compiled with Adam,
+    for one hot targets, or for the integer ones of vectorize_data(sparse=True) with sparse=True.
+    '''
     # Define an input sequence and process it.
     encoder_inputs = Input(shape=(None,), dtype='float32')
     encoder_inputs_ = Embedding(num_encoder_tokens, num_encoder_tokens,                           
@@ -415,6 +857,13 @@ def build_model(num_encoder_tokens, latent_dim):
     # `encoder_input_data` & `decoder_input_data` into `decoder_target_data`
     model = Model([encoder_inputs, decoder_inputs], decoder_outputs)
     #model = Model(decoder_inputs, decoder_outputs)
+    if lr is not None:
+        if sparse:
+            model.compile(optimizer=optimizers.Adam(lr=lr), loss=masked_sparse_categorical_crossentropy,
+                          metrics=['sparse_categorical_accuracy'])
+        else:
+            model.compile(optimizer=optimizers.Adam(lr=lr), loss='categorical_crossentropy',
+                          metrics=['categorical_accuracy'])
     print('encoder-decoder  model:')
     print(model.summary()) 
     
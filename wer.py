@@ -0,0 +1,187 @@
+"""
+    Word and character error rates, on top of one edit distance kernel.
+    edit_distance() is the bit-parallel Levenshtein distance of
+    Myers (1999) in Hyyro's formulation: each column of the
+    dynamic programming table is kept as bit vectors in Python
+    ints, so a whole column costs a handful of integer operations
+    and there is no limit on the sequence length.
+    operations() breaks the distance down into substitutions,
+    deletions and insertions, for WER and CER reports.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# packed alignment cell: cost << 40 | (deletions + insertions) << 20 | deletions,
+# so that the smallest cell is the cheapest alignment with the fewest indels
+SUB = 1 << 40
+INS = (1 << 40) + (1 << 20)
+DEL = (1 << 40) + (1 << 20) + 1
+
+
+def edit_distance(a, b):
+    '''
+    Levenshtein distance between two sequences, of words or characters
+    edit_distance('calculating wer'.split(), 'calculate wer'.split()) => 1
+    '''
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    # bit i of peq[x] is set where a[i] == x
+    peq = {}
+    for i, x in enumerate(a):
+        peq[x] = peq.get(x, 0) | (1 << i)
+    mask = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    pv, mv, score = mask, 0, len(a)
+    for y in b:
+        eq = peq.get(y, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+class Errors(namedtuple('Errors', 'substitutions deletions insertions length')):
+    '''Edit operations against a reference of `length` words or characters, summed with +'''
+    __slots__ = ()
+
+    def __add__(self, other):
+        return Errors(*(a + b for a, b in zip(self, other)))
+
+    @property
+    def errors(self):
+        return self.substitutions + self.deletions + self.insertions
+
+    @property
+    def rate(self):
+        return self.errors / self.length if self.length else 0.0
+
+
+NO_ERRORS = Errors(0, 0, 0, 0)
+
+
+def operations(ref, hyp):
+    '''
+    Substitutions, deletions and insertions turning ref into hyp, in one alignment pass
+    preferring substitutions on ties. The common prefix and suffix are skipped first.
+    operations('abcd', 'xbd') => Errors(substitutions=1, deletions=1, insertions=0, length=4)
+    '''
+    length = len(ref)
+    start = 0
+    while start < min(len(ref), len(hyp)) and ref[start] == hyp[start]:
+        start += 1
+    end = 0
+    while (end < min(len(ref), len(hyp)) - start and
+           ref[len(ref) - 1 - end] == hyp[len(hyp) - 1 - end]):
+        end += 1
+    ref, hyp = ref[start:len(ref) - end], hyp[start:len(hyp) - end]
+    # tokens as integer codes, so a row of comparisons is one numpy operation
+    codes = {}
+    ref = [codes.setdefault(x, len(codes)) for x in ref]
+    hyp = np.array([codes.setdefault(y, len(codes)) for y in hyp], dtype=np.int64)
+    # each cell packs cost, indels and deletions, see SUB, DEL and INS
+    steps = np.arange(len(hyp) + 1, dtype=np.int64) * INS
+    prev = steps
+    for i, x in enumerate(ref, 1):
+        row = np.empty_like(prev)
+        row[0] = i * DEL
+        np.minimum(prev[:-1] + np.where(hyp == x, 0, SUB), prev[1:] + DEL, out=row[1:])
+        # insertions: row[j] = min over k <= j of row[k] + (j - k) * INS
+        prev = np.minimum.accumulate(row - steps) + steps
+    cell = int(prev[-1])
+    cost, indels, dels = cell >> 40, (cell >> 20) & 0xFFFFF, cell & 0xFFFFF
+    subs = cost - indels
+    return Errors(subs, dels, cost - subs - dels, length)
+
+
+def words(sentence):
+    '''the lower cased, whitespace separated words every WER here is counted over'''
+    return sentence.lower().split()
+
+
+def word_errors(gt, pred):
+    '''Errors over the lower cased words of two sentences'''
+    return operations(words(gt), words(pred))
+
+
+def char_errors(gt, pred):
+    '''Errors over the characters of two sentences'''
+    return operations(gt, pred)
+
+
+def calculate_WER_sent(gt, pred):
+    '''
+    calculate_WER('calculating wer between two sentences', 'calculate wer between two sentences')
+    '''
+    return edit_distance(words(gt), words(pred))
+
+
+def calculate_WER(gt, pred):
+    '''
+
+    :param gt: list of sentences of the ground truth
+    :param pred: list of sentences of the predictions
+    both lists must have the same length
+    :return: accumulated WER, i.e. word errors over ground truth words
+    '''
+    assert len(gt)==len(pred)
+    WER = 0
+    nb_w = 0
+    for i in range(len(gt)):
+        WER += calculate_WER_sent(gt[i], pred[i])
+        nb_w += len(words(gt[i]))
+
+    return WER / nb_w if nb_w else 0.0
+
+
+class ErrorRate(object):
+    '''
+    WER and CER counts accumulated over streamed (gt, pred) pairs, without keeping them
+    rate = ErrorRate(); rate.update(gt, pred); rate.wer, rate.cer
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.words = NO_ERRORS
+        self.chars = NO_ERRORS
+        self.sentences = 0
+
+    def update(self, gt, pred):
+        self.words += word_errors(gt, pred)
+        self.chars += char_errors(gt, pred)
+        self.sentences += 1
+
+    def update_many(self, gts, preds):
+        for gt, pred in zip(gts, preds):
+            self.update(gt, pred)
+
+    def merge(self, other):
+        '''add the counts of another ErrorRate, e.g. from another process'''
+        self.words += other.words
+        self.chars += other.chars
+        self.sentences += other.sentences
+
+    @property
+    def wer(self):
+        return self.words.rate
+
+    @property
+    def cer(self):
+        return self.chars.rate
+
+    def result(self):
+        return {'wer': self.wer, 'cer': self.cer, 'sentences': self.sentences,
+                'word_errors': self.words._asdict(), 'char_errors': self.chars._asdict()}